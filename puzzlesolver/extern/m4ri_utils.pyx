@@ -4,7 +4,7 @@
 from m4ri cimport mzd_t
 from m4ri cimport mzd_init, mzd_free
 from m4ri cimport mzd_read_bit, mzd_write_bit
-from m4ri cimport mzd_inv_m4ri, mzd_mul_m4rm
+from m4ri cimport mzd_inv_m4ri, mzd_mul_m4rm, mzd_transpose
 
 
 cdef mzd_to_mat(mzd_t *A_mzd, m, n):
@@ -21,18 +21,84 @@ cdef mzd_t *mat_to_mzd(A, m, n):
     return A_mzd
 
 
-def mat_inv_GF2(A):
-    """Returns the inverse of A."""
-    m = len(A)
-    n = len(A[0])
-    cdef mzd_t *A_mzd = mat_to_mzd(A, m, n)
+cdef class GF2Matrix:
+    """A matrix over GF(2) that stays in m4ri form between operations."""
+    cdef mzd_t *_mzd
+    cdef mzd_t *_transpose_mzd
+    cdef readonly int rows, cols
 
-    cdef mzd_t *A_inv_mzd = mzd_inv_m4ri(NULL, A_mzd, 0)
-    A_inv = mzd_to_mat(A_inv_mzd, m, n)
-    mzd_free(A_mzd)
-    mzd_free(A_inv_mzd)
+    def __cinit__(self, A=None):
+        self._mzd = NULL
+        self._transpose_mzd = NULL
+        if A is not None:
+            self.rows = len(A)
+            self.cols = len(A[0])
+            self._mzd = mat_to_mzd(A, self.rows, self.cols)
+
+    def __dealloc__(self):
+        if self._mzd is not NULL:
+            mzd_free(self._mzd)
+        if self._transpose_mzd is not NULL:
+            mzd_free(self._transpose_mzd)
+
+    @staticmethod
+    cdef GF2Matrix _wrap(mzd_t *A_mzd):
+        cdef GF2Matrix matrix = GF2Matrix()
+        matrix._mzd = A_mzd
+        matrix.rows = A_mzd.nrows
+        matrix.cols = A_mzd.ncols
+        return matrix
+
+    def inverse(self):
+        """Returns the inverse of this matrix."""
+        return GF2Matrix._wrap(mzd_inv_m4ri(NULL, self._mzd, 0))
+
+    def transpose(self):
+        return GF2Matrix._wrap(mzd_transpose(NULL, self._mzd))
 
-    return A_inv
+    def tolist(self):
+        return mzd_to_mat(self._mzd, self.rows, self.cols)
+
+    def popcounts(self, boards):
+        """Multiplies this matrix with every board, and returns the number of
+        ones of every product.
+
+        A board is an int of `cols` bits whose most significant bit is its
+        first entry. Rather than as the columns of one matrix B, the boards
+        are written as the rows of B^T, so that the product is computed with
+        a single multiplication B^T A^T, whose rows are the products. A^T is
+        kept for the next calls.
+        """
+        if self.cols > 64:
+            raise ValueError("Boards are limited to 64 entries")
+        boards = list(boards)
+        cdef int k = len(boards), n = self.cols, i, j, count
+        cdef unsigned long long board
+        if k == 0:
+            return []
+        if self._transpose_mzd is NULL:
+            self._transpose_mzd = mzd_transpose(NULL, self._mzd)
+        cdef mzd_t *B_mzd = mzd_init(k, n)
+        for i in range(k):
+            board = boards[i]
+            for j in range(n):
+                if (board >> (n - 1 - j)) & 1:
+                    mzd_write_bit(B_mzd, i, j, 1)
+        cdef mzd_t *C_mzd = mzd_mul_m4rm(NULL, B_mzd, self._transpose_mzd, 0)
+        counts = [0] * k
+        for i in range(k):
+            count = 0
+            for j in range(self.rows):
+                count += mzd_read_bit(C_mzd, i, j)
+            counts[i] = count
+        mzd_free(B_mzd)
+        mzd_free(C_mzd)
+        return counts
+
+
+def mat_inv_GF2(A):
+    """Returns the inverse of A."""
+    return GF2Matrix(A).inverse().tolist()
 
 
 def mat_mul_GF2(A, B):
@@ -56,8 +56,12 @@ class PuzzleManagerClass:
     
     def getSolverClass(self, puzzleid, variantid=None, test=False):
         """Get Solver Class given the puzzleid"""
+        # Rush Hour hashes are too sparse to be used as indices. TopSpin
+        # keeps the pickled databases it has always been served from.
         if puzzleid == RushHour.id or puzzleid == TopSpin.id:
             return PickleSolver
+        if puzzleid == ToadsAndFrogsPuzzle.id and variantid in ToadsAndFrogsPuzzle.sparse_variants:
+            return PickleSolver
         if puzzleid == LightsOut.id:
             if variantid in LightsOut.closed_form_variants:
                 return LightsOutClosedFormSolver
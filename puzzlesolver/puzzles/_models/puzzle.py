@@ -7,6 +7,9 @@ import warnings
 class Puzzle:
     id = None
     startRandomized = False
+    # Incremented whenever __hash__ changes, so that databases solved with
+    # an older hash are not served
+    hash_version = 0
 
     #################################################################
     # Initializer
@@ -113,6 +116,20 @@ class Puzzle:
         """
         raise NotImplementedError
 
+    def doMoveUnchecked(self, move):
+        """Same as doMove, for a move that is known to be in generateMoves,
+        e.g. because a solver just generated it. Puzzles whose doMove checks
+        the move against generateMoves should override this to skip the
+        check; moves coming from users should still go through doMove.
+
+        Inputs
+            move -- type defined by generateMoves
+
+        Outputs:
+            Puzzle with move executed
+        """
+        return self.doMove(move)
+
     def generateMoves(self, movetype="legal"):
         """Generate moves from self (including undos)
 
@@ -15,6 +15,11 @@ variant_start = {
 	"6x7_6": "X-X-X-" + "-" * 30 + "O-O-O-"
 }
 
+# The X and O bishops swap sides
+variant_solution = {
+	variant_id: start.translate(str.maketrans("XO", "OX")) for variant_id, start in variant_start.items()
+}
+
 size_to_variant = {20: "4x5_8", 28: "4x7_4", 42: "6x7_6"}
 
 components = {
@@ -50,7 +55,7 @@ class Bishop(ServerPuzzle):
 		return self.variant_id
 	
 	def primitive(self, **kwargs):
-		if self.board == self.generateSolutions()[0].board:
+		if self.board == variant_solution[self.variant_id]:
 			return PuzzleValue.SOLVABLE
 		return PuzzleValue.UNDECIDED
 	
@@ -138,8 +143,7 @@ class Bishop(ServerPuzzle):
 			return Bishop.h(component_size, self.num_bishops // 2, component)
 	
 	def generateSolutions(self, **kwargs):
-		replace = lambda c: 'X' if c == 'O' else 'O' if c == 'X' else '-'
-		return [Bishop(self.variant_id, ''.join([replace(c) for c in variant_start[self.variant_id]]))]
+		return [Bishop(self.variant_id, variant_solution[self.variant_id])]
 	
 	@classmethod
 	def fromHash(cls, variant_id, hash_val):
@@ -21,6 +21,7 @@ class Hanoi(ServerPuzzle):
 
     id = 'towersofhanoi'
     variants = [f'{x}_{y}' for x in range(3, 5) for y in range(1, 9)]
+    test_variants = ['3_3']
     startRandomized = False
 
     def __init__(self,  variantid=None, variant=None):
@@ -218,7 +219,9 @@ class Hanoi(ServerPuzzle):
         """
         if move not in self.generateMoves():
             raise ValueError("Move not possible")
+        return self.doMoveUnchecked(move)
 
+    def doMoveUnchecked(self, move):
         newPuzzle = Hanoi(variantid=self.variant)
         rods = self.rods.copy()
 
@@ -204,9 +204,12 @@ class HopNDrop(ServerPuzzle):
     ### _________ end HELPERS _________________ ###
 
     def doMove(self, move, **kwargs):
-        #Find X
         return [HopNDrop(self.variant)]
         if move not in self.generateMoves(): raise ValueError
+        return self.doMoveUnchecked(move)
+
+    def doMoveUnchecked(self, move, **kwargs):
+        #Find X
         new_board = deepcopy(self.board)
         row_count = 0
         for row in new_board:
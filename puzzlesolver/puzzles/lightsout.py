@@ -5,7 +5,6 @@ Author: Anthony Ling (v0), Robert Shi (v1, AutoGUI)
 Date: January 14, 2023
 """
 
-from copy import deepcopy
 from . import ServerPuzzle
 from ..util import *
 
@@ -13,70 +12,88 @@ class LightsOut(ServerPuzzle):
 
     id = "lightsout"
 
-    try:
-        from ..extern import m4ri_utils
-    except:
-        variants = [str(i) for i in range(2, 6)]
-        closed_form_variants = []
-    else:
-        variants = [str(i) for i in range(2, 9)]
-        closed_form_variants = ['2', '3', '6', '7', '8']
+    variants = [str(i) for i in range(2, 9)]
+    test_variants = ['3', '4']
+    # Served by the LightsOutClosedFormSolver, with or without m4ri
+    closed_form_variants = ['2', '3', '6', '7', '8']
     startRandomized = True
+    # Toggle masks of every move, by size (see _toggleMasks)
+    _masks = {}
 
-    def __init__(self, variant='3'):
-        variant = int(variant)
-        self.grid = [[True for _ in range(variant)] for _ in range(variant)]
-        self.size = variant
+    def __init__(self, variant='3', board=None):
+        self.size = int(variant)
+        # Cell (x, y) is bit size * size - 1 - (y * size + x) of the board,
+        # i.e. the board read from its most significant bit is the grid row
+        # by row. All lights are on by default.
+        self.board = (1 << self.size * self.size) - 1 if board is None else board
 
     @property
     def variant(self):
-        return str(len(self.grid))
+        return str(self.size)
+
+    @property
+    def numPositions(self):
+        return 2 ** (self.size * self.size)
+
+    @property
+    def grid(self):
+        """The board as rows of booleans"""
+        cells = self.size * self.size
+        return [[bool((self.board >> (cells - 1 - y * self.size - x)) & 1) for x in range(self.size)]
+            for y in range(self.size)]
+
+    @grid.setter
+    def grid(self, grid):
+        board = 0
+        for row in grid:
+            for entry in row:
+                board = (board << 1) | bool(entry)
+        self.board = board
 
     def __str__(self):
         return "\n".join([str([int(i) for i in row]) for row in self.grid])
     
     def primitive(self):
-        for row in self.grid:
-            for entry in row:
-                if entry == 1: return PuzzleValue.UNDECIDED
+        if self.board:
+            return PuzzleValue.UNDECIDED
         return PuzzleValue.SOLVABLE
     
     def doMove(self, move):
-        x, y = move[0], move[1]
-        puzzle = LightsOut(variant=str(self.size))
-        puzzle.grid = deepcopy(self.grid)
-        for i in range(max(x - 1, 0), min(self.size, x + 2)):
-            puzzle.grid[y][i] = not puzzle.grid[y][i]
-        for j in range(max(y - 1, 0), min(self.size, y + 2)):
-            puzzle.grid[j][x] = not puzzle.grid[j][x]
-        puzzle.grid[y][x] = not puzzle.grid[y][x]
-        return puzzle
+        return LightsOut(self.size, self.board ^ LightsOut._toggleMasks(self.size)[move])
 
     def generateMoves(self, movetype="all"):
         if movetype == 'for' and movetype == 'back': return []
-        return [(i, j) for i in range(len(self.grid)) for j in range(len(self.grid))]
+        return list(LightsOut._toggleMasks(self.size))
+
+    @staticmethod
+    def _toggleMasks(size):
+        """Returns a dict from every move (x, y) of the variant of this size
+        to the mask of the lights it toggles, in the order of generateMoves"""
+        if size not in LightsOut._masks:
+            cells = size * size
+            def bit(x, y):
+                return 1 << (cells - 1 - y * size - x)
+            masks = {}
+            for x in range(size):
+                for y in range(size):
+                    mask = bit(x, y)
+                    for i in range(max(x - 1, 0), min(size, x + 2)):
+                        mask |= bit(i, y)
+                    for j in range(max(y - 1, 0), min(size, y + 2)):
+                        mask |= bit(x, j)
+                    masks[(x, y)] = mask
+            LightsOut._masks[size] = masks
+        return LightsOut._masks[size]
 
     def __hash__(self):
-        result = ""
-        for row in self.grid:
-            str_row = [str(int(entry)) for entry in row]
-            result += "".join(str_row)
-        return int(result, base=2)
+        return self.board
 
     def generateSolutions(self):
-        puzzle = LightsOut(variant=self.size)
-        puzzle.grid = [[False for _ in range(self.size)] for _ in range(self.size)]
-        return [puzzle]
+        return [LightsOut(self.size, 0)]
 
     @classmethod
     def fromHash(cls, variantid, hash_val):
-        puzzle = cls(variant=variantid)
-        grid_size = puzzle.size * puzzle.size
-        hash_str = format(hash_val, "{}b".format(grid_size))
-        for i in range(puzzle.size):
-            for j in range(puzzle.size):
-                puzzle.grid[i][j] = (hash_str[i * puzzle.size + j] == '1')
-        return puzzle
+        return cls(variantid, hash_val)
 
     @classmethod
     def generateStartPosition(cls, variantid):
@@ -88,26 +105,19 @@ class LightsOut(ServerPuzzle):
         variant = int(variant_id)
         if str(variant) not in LightsOut.variants:
             raise TypeError("Unsupported variant")
-        puzzle = cls(variant=variant)
-        puzzle.grid = []
-        for i in range(variant):
-            row = position[i*variant:(i+1)*variant]
-            row = [True if i == '1' else False for i in row]
-            puzzle.grid.append(row)
-        return puzzle
+        if len(position) != variant * variant:
+            raise ValueError("Position has {} lights instead of {}".format(len(position), variant * variant))
+        return cls(variant, int(''.join('1' if c == '1' else '0' for c in position), 2))
 
     def toString(self, mode):
         result = '1_' if mode == StringMode.AUTOGUI else ''
-        for row in self.grid:
-            str_row = ['1' if entry else '0' for entry in row]
-            result += ''.join(str_row)
-        return result
+        return result + format(self.board, '0{}b'.format(self.size * self.size))
     
     def moveString(self, move, mode):
         if mode == StringMode.AUTOGUI:
-            return f'A_t_{move[0] + move[1] * len(self.grid)}_x'
+            return f'A_t_{move[0] + move[1] * self.size}_x'
         else:
-            return f"{chr(ord('a') + move[0])}{len(self.grid) - move[1]}"
+            return f"{chr(ord('a') + move[0])}{self.size - move[1]}"
 
     def isLegalPosition(self):
         return True
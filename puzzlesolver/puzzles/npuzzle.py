@@ -20,6 +20,8 @@ class Npuzzle(ServerPuzzle):
     
     variants = [str(i) for i in range(3, 4)]
     startRandomized = True
+    # Solved board of every size (see primitive)
+    _solved = {}
 
     def __init__(self, size=3):
         if not isinstance(size,int): raise ValueError
@@ -33,14 +35,26 @@ class Npuzzle(ServerPuzzle):
     def variant(self):
         return str(self.size)
 
+    @property
+    def position(self):
+        return self._position
+
+    @position.setter
+    def position(self, position):
+        self._position = position
+        # Computed on the first hash, or from the hash of the parent position
+        # by doMove
+        self._hash = None
+
+    @property
+    def numPositions(self):
+        # The hash is the permutation index of the board
+        return math.factorial(self.size * self.size)
+
     def __hash__(self):
-        board_size = self.size * self.size
-        h = 0
-        col_ids = list(range(board_size))
-        for i in range(board_size):
-            h += col_ids.index(self.position[i]) * math.factorial(board_size - i - 1)
-            col_ids.remove(self.position[i])
-        return h
+        if self._hash is None:
+            self._hash = permutationRank(self._position)
+        return self._hash
 
     def __str__(self):
         ret = ""
@@ -51,13 +65,18 @@ class Npuzzle(ServerPuzzle):
         return ret
 
     def primitive(self):
-        if self.position == [i for i in range(1, self.size**2)] + [0]:
+        solved = Npuzzle._solved.get(self.size)
+        if solved is None:
+            solved = Npuzzle._solved[self.size] = [i for i in range(1, self.size**2)] + [0]
+        if self.position == solved:
             return PuzzleValue.SOLVABLE
         return PuzzleValue.UNDECIDED
 
     def doMove(self, move):
         newPuzzle = Npuzzle(size=self.size)
-        newPuzzle.position = Npuzzle.swap(self.position[:], move[0], move[1])
+        newPuzzle.position = Npuzzle.swap(self._position[:], move[0], move[1])
+        if self._hash is not None:
+            newPuzzle._hash = permutationSwapRank(self._hash, self._position, move[0], move[1])
         return newPuzzle
 
     def generateMoves(self, movetype='bi'):
@@ -80,14 +99,7 @@ class Npuzzle(ServerPuzzle):
     @classmethod
     def fromHash(cls, variantid, hash_val):
         puzzle = cls(int(variantid))
-        board_size = puzzle.size**2
-        col_ids = list(range(board_size))
-        position = []
-        for r in range(board_size - 1, -1, -1):
-            f = math.factorial(r)
-            position.append(col_ids.pop(hash_val // f))
-            hash_val %= f
-        puzzle.position = position
+        puzzle.position = permutationUnrank(puzzle.size**2, hash_val)
         return puzzle
 
     @classmethod
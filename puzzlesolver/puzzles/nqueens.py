@@ -29,6 +29,12 @@ class NQueens(ServerPuzzle):
     @property
     def variant(self):
         return str(self.N)
+
+    @property
+    def numPositions(self):
+        # Hashes are ranked by the number of queens placed, then by position
+        # (see __hash__), so they cover every board with 0 to N queens
+        return NQueens.B(self.N, self.N + 1)
     
     def safe_squares(self, bitboard):
         """
@@ -234,6 +240,7 @@ class NQueens(ServerPuzzle):
 
         for row, col in zip(row_ids, col_ids):
             puzzle.bitboard |= (1 << (row * puzzle.N) + col)
+        puzzle.placed_so_far = placed_so_far
         return puzzle
     
     @classmethod
@@ -94,6 +94,11 @@ class Peg(ServerPuzzle):
     @property
     def variant(self):
         return self.variant_id
+
+    @property
+    def numPositions(self):
+        # The hash is the board itself, one bit per slot
+        return 1 << variant_data[self.variant_id]['size']
     
     def __hash__(self):
         return self.board
@@ -8,7 +8,10 @@ Date: September 14th, 2020
 import random
 from . import ServerPuzzle
 from ..util import *
+from array import array
+from itertools import permutations
 import math
+import numpy as np
 
 """
     IMPLEMENTATION OF A 2x2x2 RUBIKS CUBE
@@ -70,27 +73,230 @@ corner_colors_arr = [[0,1,5], [0,1,2], [0,3,5], [0,2,3], [1,2,4], [1,4,5], [2,3,
 starts = [ord(c) for c in 'agm']
 start_idxs = [(0, 16), (4, 12), (8, 20)]
 
+"""
+    CUBIE COORDINATES
+
+    Internally, a cube is a pair (perm, twist) of ints:
+    - perm is the index, in lexicographic order, of the permutation of the
+      8 corner cubies over the 8 corner positions (of corner_indices_arr)
+    - twist is sum(t[i] * 3**i for i in range(7)), where t[i] is how many
+      facelets the F/B sticker of the cubie at position i is turned away
+      from the first facelet of CubieTables.corners[i]. t[7] is implied,
+      since the twists of a cube add up to 0 (mod 3).
+
+    Every move and whole-cube rotation (syms) is then a lookup table for
+    each coordinate. The hash is a perfect hash of the rotations of a cube:
+    it is the (perm, twist) of the rotation that brings cubie 7 to position 7
+    without twist, packed into 7! * 3**6 = 3674160 values.
+"""
+
+def _rank(perms):
+    """Lexicographic indices of the rows of the 2D array perms"""
+    ranks = np.zeros(len(perms), dtype=np.int64)
+    k = perms.shape[1]
+    for i in range(k):
+        smaller = (perms[:, i + 1:] < perms[:, i:i + 1]).sum(axis=1)
+        ranks += smaller * math.factorial(k - 1 - i)
+    return ranks
+
+class CubieTables:
+    """Move, symmetry and hash tables of the cubie coordinates, built with
+    NumPy the first time they are needed (see get)."""
+
+    TWISTS = 3 ** 7
+    HASH_TWISTS = 3 ** 6
+    instance = None
+
+    @staticmethod
+    def get():
+        if CubieTables.instance is None:
+            CubieTables.instance = CubieTables()
+        return CubieTables.instance
+
+    def __init__(self):
+        # Every move and then every symmetry as facelet destinations, i.e.
+        # the sticker at facelet i goes to facelet dest[i]
+        dests = []
+        for move in range(12):
+            side = rotations[move % 6]
+            direction = 1 if move < 6 else -1
+            dest = list(range(24))
+            for i in range(3):
+                for j in range(4):
+                    dest[side[(i << 2) | j]] = side[(i << 2) | ((j + direction) & 0b11)]
+            dests.append(dest)
+        for sym in syms:
+            dest = [0] * 24
+            for i in range(24):
+                dest[sym[i]] = i
+            dests.append(dest)
+
+        self.corners = CubieTables.orderCorners(dests)
+        position, index = {}, {}
+        for p, corner in enumerate(self.corners):
+            for k, f in enumerate(corner):
+                position[f], index[f] = p, k
+        # The colors of every cubie, in the order of the facelets of its
+        # position in the solved cube (facelet f is of color f // 4)
+        self.colors = [None] * 8
+        solved_perm = []
+        for corner in self.corners:
+            colors = [f // 4 for f in corner]
+            cubie = corner_colors_arr.index(sorted(colors))
+            self.colors[cubie] = colors
+            solved_perm.append(cubie)
+
+        all_perms = np.array(list(permutations(range(8))), dtype=np.int64)
+        twist_digits = np.zeros((CubieTables.TWISTS, 8), dtype=np.int64)
+        for i in range(7):
+            twist_digits[:, i] = np.arange(CubieTables.TWISTS) // 3 ** i % 3
+        twist_digits[:, 7] = -twist_digits[:, :7].sum(axis=1) % 3
+        weights = 3 ** np.arange(7)
+        perm_tables, twist_tables, self.canonical_syms = [], [], [[None] * 3 for _ in range(8)]
+        for d, dest in enumerate(dests):
+            # The cubie at position q goes to position targets[q], and its
+            # twist increases by offsets[q]
+            targets = [position[dest[corner[0]]] for corner in self.corners]
+            offsets = [index[dest[corner[0]]] for corner in self.corners]
+            sources = [targets.index(p) for p in range(8)]
+            perm_tables.append(_rank(all_perms[:, sources]))
+            twists = (twist_digits[:, sources] + [offsets[q] for q in sources]) % 3
+            twist_tables.append(twists[:, :7] @ weights)
+            if d >= 12:
+                # The symmetry that brings cubie 7 from position p with twist
+                # t to position 7 without twist is canonical_syms[p][t]
+                p = sources[7]
+                self.canonical_syms[p][-offsets[p] % 3] = d - 12
+        self.perm_moves = [array('H', table.astype(np.uint16).tobytes()) for table in perm_tables[:12]]
+        self.twist_moves = [table.tolist() for table in twist_tables[:12]]
+        self.perm_syms = [array('H', table.astype(np.uint16).tobytes()) for table in perm_tables[12:]]
+        self.twist_syms = [table.tolist() for table in twist_tables[12:]]
+
+        # Hash of a canonical cube: index of the permutation of cubies 0-6
+        # over positions 0-6, then the twists of positions 0-5
+        perm_hashes = _rank(all_perms[:, :7]) * CubieTables.HASH_TWISTS
+        self.cubie7_positions = array('B', np.argmax(all_perms == 7, axis=1).astype(np.uint8).tobytes())
+        self.perm_hashes = [array('I', perm_hashes[table].astype(np.uint32).tobytes()) for table in perm_tables[12:]]
+        self.twist_hashes = [(table % CubieTables.HASH_TWISTS).tolist() for table in twist_tables[12:]]
+        canonical = np.flatnonzero(all_perms[:, 7] == 7)
+        self.unhash_perms = array('H', canonical.astype(np.uint16).tobytes())
+        self.digits = [tuple(digits) for digits in twist_digits.tolist()]
+        self.solved = (int(_rank(np.array([solved_perm]))[0]), 0)
+        self.solved_hash = self.hash(*self.solved)
+        # Every rotation of the solved cube, as perm * TWISTS + twist
+        self.solved_states = frozenset(
+            self.perm_syms[s][self.solved[0]] * CubieTables.TWISTS + self.twist_syms[s][0]
+            for s in range(len(syms)))
+
+    def hash(self, perm, twist):
+        p = self.cubie7_positions[perm]
+        s = self.canonical_syms[p][self.digits[twist][p]]
+        return self.perm_hashes[s][perm] + self.twist_hashes[s][twist]
+
+    def unhash(self, hash_val):
+        """Returns the (perm, twist) of the canonical cube of hash_val"""
+        perm, twist = divmod(hash_val, CubieTables.HASH_TWISTS)
+        # The twist of position 6 is implied by the twists of positions 0-5
+        # (and position 7, which has no twist)
+        return self.unhash_perms[perm], twist + self.digits[twist][7] * CubieTables.HASH_TWISTS
+
+    @staticmethod
+    def orderCorners(dests):
+        """Orders the facelets of every corner position, starting from the
+        F/B facelet, so that all of them go around their corner in the same
+        direction (i.e. so that moves preserve the order of the facelets of
+        a cubie, up to a rotation)."""
+        first = [next(f for f in corner if f // 4 in (0, 4)) for corner in corner_indices_arr]
+        position = {f: p for p, corner in enumerate(corner_indices_arr) for f in corner}
+        corners = {0: tuple(sorted(corner_indices_arr[0], key=lambda f: f != first[0]))}
+        queue = [0]
+        while queue:
+            q = queue.pop()
+            for dest in dests:
+                image = [dest[f] for f in corners[q]]
+                p = position[image[0]]
+                k = image.index(first[p])
+                image = tuple(image[k:] + image[:k])
+                if p not in corners:
+                    corners[p] = image
+                    queue.append(p)
+                elif corners[p] != image:
+                    raise ValueError("Moves don't preserve the orientation of corners")
+        return [corners[p] for p in range(8)]
+
+    def fromFacelets(self, cube):
+        """Returns the (perm, twist) of the facelet colors cube, or raises a
+        ValueError if they are not the colors of a cube"""
+        cubies, twists = [], []
+        for corner in self.corners:
+            colors = [cube[f] for f in corner]
+            if sorted(colors) not in corner_colors_arr:
+                raise ValueError("Corner {} has colors {}".format(corner, colors))
+            cubie = corner_colors_arr.index(sorted(colors))
+            twist = colors.index(self.colors[cubie][0])
+            if colors != self.colors[cubie][-twist:] + self.colors[cubie][:-twist]:
+                raise ValueError("Corner {} is mirrored".format(corner))
+            cubies.append(cubie)
+            twists.append(twist)
+        if sorted(cubies) != list(range(8)) or sum(twists) % 3:
+            raise ValueError("Not a valid cube")
+        perm = int(_rank(np.array([cubies]))[0])
+        return perm, sum(t * 3 ** i for i, t in enumerate(twists[:7]))
+
+    def toFacelets(self, perm, twist):
+        cubies = CubieTables.unrank(perm, 8)
+        cube = [None] * 24
+        for corner, cubie, t in zip(self.corners, cubies, self.digits[twist]):
+            colors = self.colors[cubie]
+            for k, f in enumerate(corner):
+                cube[f] = colors[(k - t) % 3]
+        return cube
+
+    @staticmethod
+    def unrank(rank, k):
+        items, perm = list(range(k)), []
+        for i in range(k - 1, -1, -1):
+            digit, rank = divmod(rank, math.factorial(i))
+            perm.append(items.pop(digit))
+        return perm
+
 class Rubiks(ServerPuzzle):
 
     id = 'rubikscube'
     variants = ["2x2x2"]
     startRandomized = True
+    # 1: perfect hash of the cube up to rotations (see CUBIE COORDINATES)
+    hash_version = 1
 
-    def __init__(self, cube=None, **kwargs):
-        if cube:
-            self.cube = cube
+    def __init__(self, cube=None, perm=None, twist=None, **kwargs):
+        if perm is not None:
+            self.perm, self.twist = perm, twist
+        elif cube:
+            self.perm, self.twist = CubieTables.get().fromFacelets(cube)
         else:
-            self.cube = [0,0,0,0,1,1,1,1,2,2,2,2,3,3,3,3,4,4,4,4,5,5,5,5]
+            self.perm, self.twist = CubieTables.get().solved
             for _ in range(random.randint(15, 25)):
-                self.cube = self.doMove(random.randint(0, 11)).cube
+                puzzle = self.doMove(random.randint(0, 11))
+                self.perm, self.twist = puzzle.perm, puzzle.twist
 
     @property
     def variant(self):
         """Returns a string defining the variant of this puzzleself."""
         return "2x2x2"
 
+    @property
+    def numPositions(self):
+        return math.factorial(7) * CubieTables.HASH_TWISTS
+
+    @property
+    def cube(self):
+        """The colors of the 24 facelets"""
+        return CubieTables.get().toFacelets(self.perm, self.twist)
+
     def primitive(self, **kwargs):
-        return PuzzleValue.SOLVABLE if self.cube in [solution.cube for solution in self.generateSolutions()] else PuzzleValue.UNDECIDED
+        if self.perm * CubieTables.TWISTS + self.twist in CubieTables.get().solved_states:
+            return PuzzleValue.SOLVABLE
+        return PuzzleValue.UNDECIDED
 
     # Generate Legal Moves & all undo moves
     def generateMoves(self, movetype, **kwargs):
@@ -100,34 +306,11 @@ class Rubiks(ServerPuzzle):
             return []
 
     def doMove(self, move, **kwargs):
-        side = rotations[move % 6]
-        cube = self.cube[:]
-        direction = 1 if move < 6 else -1 # CW if move < 6 else CCW
-        for i in range(3):
-            for j in range(4):
-                k1 = (i << 2) | j
-                k2 = (i << 2) | ((j + direction) & 0b11)
-                cube[side[k2]] = self.cube[side[k1]]
-        return Rubiks(cube=cube)
-    
-    def h(cube):
-        corner_ids, orientations = [], []
-        for corner_indices in corner_indices_arr:
-            corner_colors = sorted([cube[index] for index in corner_indices])
-            corner_ids.append(corner_colors_arr.index(corner_colors))
-            orientations.append(corner_colors.index(cube[corner_indices[0]]))
-        h = 0
-        corners = list(range(8))
-        for i in range(8):
-            h += corners.index(corner_ids[i]) * math.factorial(7 - i)
-            corners.remove(corner_ids[i])
-        return h * 2187 + sum([orientations[i]* 3**i for i in range(7)])
-
-    def __hash__(self): # Return hash of the member that has the minimum hash within the cube's orbit
-        min_hash = Rubiks.h(self.cube)
-        for symmetry_id in range(1, 24):
-            min_hash = min(min_hash, Rubiks.h([self.cube[i] for i in syms[symmetry_id]]))            
-        return min_hash
+        tables = CubieTables.get()
+        return Rubiks(perm=tables.perm_moves[move][self.perm], twist=tables.twist_moves[move][self.twist])
+
+    def __hash__(self): # Perfect hash of the cube up to rotations, see CUBIE COORDINATES
+        return CubieTables.get().hash(self.perm, self.twist)
         
     def generateSolutions(self, **kwargs):
         solved_cubes = [
@@ -143,14 +326,10 @@ class Rubiks(ServerPuzzle):
     ### ________ Server _________
     @classmethod
     def fromHash(cls, variantid, hash_val):
-        """ 
-        Note that this function does not actually unhash the given hash value
-        because the hash method we used here is irreversible. Since this
-        method is only used to generate random positions of a puzzle, we
-        instead return a position that is already randomized by the constructor
-        of a Rubiks instance.
-        """
-        return cls()
+        """Returns the rotation of the cube with cubie 7 in position 7 and
+        without twist, out of the 24 rotations of the cube of hash_val"""
+        perm, twist = CubieTables.get().unhash(hash_val)
+        return cls(perm=perm, twist=twist)
 
     @classmethod
     def fromString(cls, variant_id, position_str):
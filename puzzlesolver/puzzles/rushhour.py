@@ -12,6 +12,103 @@ import random
 import os
 dirname = os.path.dirname(__file__)
 
+# Pieces are coded as kind << 6 | cell, where cell is the top-left cell of the
+# piece (cells are numbered row by row from 0 to 35) and kind indexes PIECES.
+# The red piece is always the first piece of a position.
+RED, HORIZONTAL_2, HORIZONTAL_3, VERTICAL_2, VERTICAL_3 = range(5)
+PIECES = ['12', 'LR', 'LmR', 'TB', 'TMB']
+STEPS = [1, 1, 1, 6, 6]
+# The red piece in front of the exit
+RED_EXIT = RED << 6 | 16
+
+def _cells(code):
+    kind, cell = code >> 6, code & 63
+    return [cell + STEPS[kind] * k for k in range(len(PIECES[kind]))]
+
+def _codes():
+    """Every piece code that fits on the board"""
+    codes = [RED << 6 | cell for cell in range(12, 17)]
+    for kind in range(HORIZONTAL_2, len(PIECES)):
+        for cell in range(36):
+            last = _cells(kind << 6 | cell)[-1]
+            if last < 36 and (STEPS[kind] == 6 or last // 6 == cell // 6):
+                codes.append(kind << 6 | cell)
+    return codes
+
+def _hashDigits(red_col):
+    """Returns the (cell, pieces) digits of the hash, from the least
+    significant one, after the column of the red piece: the digit of a cell
+    is the index of the piece on it in pieces. Only every other cell is
+    needed to recover the board."""
+    digits = []
+    # Every other remaining cell of the third row
+    for i in range(12, 18, 2):
+        if i % 6 == red_col or i % 6 == red_col + 1:
+            continue
+        digits.append((i, '-TMB'))
+    # Then the top-left cell
+    digits.append((0, '-LT'))
+    # Finally every other cell of the rest of the grid
+    for j in range(2, 36):
+        # "every other cell" means row+column is even [also exclude the third row]
+        if j // 6 == 2 or ((j % 6) + (j // 6)) % 2 != 0:
+            continue
+        allowed_pieces = '-LmRTMB'
+        if j % 6 == 0:
+            allowed_pieces = '-LTMB'
+        elif j % 6 == 5:
+            allowed_pieces = '-RTMB'
+        elif j // 6 == 0:
+            allowed_pieces = '-LmRT'
+        elif j // 6 == 5:
+            allowed_pieces = '-LmRB'
+        digits.append((j, allowed_pieces))
+    return digits
+
+def _hashTable(red_col):
+    """Returns the part of the hash of every piece code, when the red piece
+    is in column red_col. Pieces that cannot be encoded are None."""
+    weights, multiplier = {}, 5
+    for cell, allowed_pieces in _hashDigits(red_col):
+        weights[cell] = (allowed_pieces, multiplier)
+        multiplier *= len(allowed_pieces)
+    table = [None] * (len(PIECES) << 6)
+    for code in _codes():
+        if code >> 6 == RED:
+            table[code] = (code & 63) - 12
+            continue
+        h = 0
+        for cell, piece in zip(_cells(code), PIECES[code >> 6]):
+            if cell in weights:
+                allowed_pieces, multiplier = weights[cell]
+                if piece not in allowed_pieces:
+                    h = None
+                    break
+                h += allowed_pieces.index(piece) * multiplier
+        table[code] = h
+    return table
+
+def _rays(code):
+    """Returns the moves of a piece in each direction, in order of distance,
+    as (bit of the cell that must be empty, new code of the piece) pairs"""
+    kind, cell = code >> 6, code & 63
+    cells = _cells(code)
+    if STEPS[kind] == 1:
+        left = [(1 << (cell - k), code - k) for k in range(1, cell % 6 + 1)]
+        right = [(1 << (cells[-1] + k), code + k) for k in range(1, 6 - cells[-1] % 6)]
+        return (tuple(left), tuple(right))
+    up = [(1 << (cell - 6 * k), code - 6 * k) for k in range(1, cell // 6 + 1)]
+    down = [(1 << (cells[-1] + 6 * k), code + 6 * k) for k in range(1, 6 - cells[-1] // 6)]
+    return (tuple(up), tuple(down))
+
+MASKS = [0] * (len(PIECES) << 6)
+RAYS = [()] * (len(PIECES) << 6)
+for _code in _codes():
+    MASKS[_code] = sum(1 << cell for cell in _cells(_code))
+    RAYS[_code] = _rays(_code)
+HASH_DIGITS = [_hashDigits(red_col) for red_col in range(5)]
+HASH_TABLES = [_hashTable(red_col) for red_col in range(5)]
+
 
 class RushHour(ServerPuzzle):
     id = "rushhour"
@@ -19,6 +116,9 @@ class RushHour(ServerPuzzle):
     # "True" would mean that the game would start at a random solvable board,
     # by looking at all solvable hashes -- hence False to ensure we fix a start position
     startRandomized = False
+    # Boards of the start position file of every variant, read on first use
+    # (see startPosition)
+    _starts = {}
 
     @classmethod
     def generateStartPosition(cls, variantid, **kwargs):
@@ -30,111 +130,119 @@ class RushHour(ServerPuzzle):
         super().__init__()
         self.variant_id = variant_id
         if pos is None:
-            variant_file = f"{dirname}/../../databases/rushhourstarts/{variant_id}.txt"
             if puzzle_id is None:
                 # Search the database for a random puzzle with the given difficulty level.
                 variant_ranges = {"basic": 4943, "easy": 4998, "medium": 5000, "hard": 4043, "expert": 1336}
                 puzzle_id = random.randrange(variant_ranges[variant_id])
+            pos = RushHour.startPosition(variant_id, puzzle_id)
+        # The position is a tuple of piece codes (see PIECES), and a bitboard
+        # of the occupied cells
+        pieces = []
+        for i, piece in enumerate(pos[:36]):
+            if piece == '1':
+                pieces.insert(0, RED << 6 | i)
+            elif piece == 'L':
+                pieces.append((HORIZONTAL_3 if i % 6 < 4 and pos[i + 1] == 'm' else HORIZONTAL_2) << 6 | i)
+            elif piece == 'T':
+                pieces.append((VERTICAL_3 if i < 24 and pos[i + 6] == 'M' else VERTICAL_2) << 6 | i)
+        if not pieces or pieces[0] >> 6 != RED:
+            raise ValueError("Position has no red piece")
+        self.pieces = tuple(pieces)
+        self.occupied = sum(MASKS[code] for code in pieces)
+
+    @classmethod
+    def fromPieces(cls, variant_id, pieces, occupied):
+        """Returns the position of the given pieces, without parsing a board"""
+        puzzle = cls.__new__(cls)
+        puzzle.variant_id = variant_id
+        puzzle.pieces = pieces
+        puzzle.occupied = occupied
+        return puzzle
+
+    @property
+    def pos(self):
+        """The 38-character board of the position, with the red piece inside
+        the grid"""
+        board = ['-'] * 36
+        for code in self.pieces:
+            kind, cell = code >> 6, code & 63
+            for k, piece in enumerate(PIECES[kind]):
+                board[cell + STEPS[kind] * k] = piece
+        return ''.join(board) + "--"
+
+    @classmethod
+    def startPosition(cls, variant_id, puzzle_id):
+        """Returns the board of the puzzle_id-th line of the start position
+        file of the variant. The file is only read the first time."""
+        return cls.startBoards(variant_id)[puzzle_id]
+
+    @classmethod
+    def startBoards(cls, variant_id):
+        """Returns the boards of the start position file of the variant"""
+        starts = cls._starts.get(variant_id)
+        if starts is None:
+            variant_file = f"{dirname}/../../databases/rushhourstarts/{variant_id}.txt"
             with open(variant_file, 'r') as variants:
-                for i, variant in enumerate(variants):
-                    if i == puzzle_id:
-                        self.pos = variant[:36] + "--"  # remove trailing newline
-                        break
-        else:
-            self.pos = pos
+                starts = [variant[:36] + "--" for variant in variants]  # remove trailing newline
+            cls._starts[variant_id] = starts
+        return starts
+
+    @classmethod
+    def generateStartPositions(cls, variantid):
+        """Returns every start position of the variant, i.e. every position
+        that generateStartPosition can return. The solve script solves all of
+        them with solveAll."""
+        if not isinstance(variantid, str) or variantid not in RushHour.variants:
+            raise TypeError("Invalid variantid")
+        return [RushHour(variantid, pos=pos) for pos in cls.startBoards(variantid)]
 
     @property
     def variant(self):
         return self.variant_id
 
     def __hash__(self):
-        # At each step, add to the total, and multiply by the number of options
-        result = 0
-        multiplier = 1
-        # First hash the position of the red piece
-        red_pos = list(self.pos[12:17]).index("1")
-        result += red_pos
-        multiplier *= 5
-        # Then the every other remaining piece in the third row
-        for i in range(12, 18, 2):
-            if i % 6 == red_pos or i % 6 == red_pos + 1:
-                continue
-            result += ['-', 'T', 'M', 'B'].index(self.pos[i]) * multiplier
-            multiplier *= 4
-        # Then the top-left piece
-        result += ['-', 'L', 'T'].index(self.pos[0]) * multiplier
-        multiplier *= 3
-        # Finally every other piece on the rest of the grid
-        for j in range(2, 36):
-            # "every other piece" means row+column is even [also exclude the third row]
-            if j // 6 == 2 or ((j % 6) + (j // 6)) % 2 != 0:
-                continue
-            allowed_pieces = ['-', 'L', 'm', 'R', 'T', 'M', 'B']
-            if j % 6 == 0:
-                allowed_pieces = ['-', 'L', 'T', 'M', 'B']
-            elif j % 6 == 5:
-                allowed_pieces = ['-', 'R', 'T', 'M', 'B']
-            elif j // 6 == 0:
-                allowed_pieces = ['-', 'L', 'm', 'R', 'T']
-            elif j // 6 == 5:
-                allowed_pieces = ['-', 'L', 'm', 'R', 'B']
-            result += allowed_pieces.index(self.pos[j]) * multiplier
-            multiplier *= len(allowed_pieces)
-        return result
+        # Every other cell of the board, in mixed radix (see _hashDigits),
+        # which is the sum of the parts of every piece
+        table = HASH_TABLES[(self.pieces[0] & 63) - 12]
+        return sum(map(table.__getitem__, self.pieces))
 
     @classmethod
     def fromHash(cls, variantid, hash_val):
-        # Invert the steps in __hash__ to find every other piece in the board
-        new_pos = ['-'] * 38
-        # First the red piece
-        red_pos = hash_val % 5
-        new_pos[12 + red_pos] = '1'
-        new_pos[12 + red_pos + 1] = '2'
+        # Invert the steps in __hash__ to find every other cell of the board
+        red_col = hash_val % 5
         hash_val //= 5
-        # Then every other piece in the third row
-        for i in range(12, 18, 2):
-            if i % 6 == red_pos or i % 6 == red_pos + 1:
-                continue
-            new_pos[i] = ['-', 'T', 'M', 'B'][hash_val % 4]
-            hash_val //= 4
-        # Then the top-left piece
-        new_pos[0] = ['-', 'L', 'T'][hash_val % 3]
-        hash_val //= 3
-        # Finally every other piece on the rest of the grid
-        for i in range(2, 36):
-            if i // 6 == 2 or ((i % 6) + (i // 6)) % 2 != 0:
-                continue
-            allowed_pieces = ['-', 'L', 'm', 'R', 'T', 'M', 'B']
-            if i % 6 == 0:
-                allowed_pieces = ['-', 'L', 'T', 'M', 'B']
-            elif i % 6 == 5:
-                allowed_pieces = ['-', 'R', 'T', 'M', 'B']
-            elif i // 6 == 0:
-                allowed_pieces = ['-', 'L', 'm', 'R', 'T']
-            elif i // 6 == 5:
-                allowed_pieces = ['-', 'L', 'm', 'R', 'B']
-            n = len(allowed_pieces)
-            new_pos[i] = allowed_pieces[hash_val % n]
-            hash_val //= n
-        # Once we have every other piece, extrapolate the rest of the board
-        for i in range(1, 36):
-            if new_pos[i] != '-' or ((i % 6) + (i // 6)) % 2 == 0:
-                continue
-            if i % 6 > 0 and new_pos[i - 1] in {'L', 'm'}:
-                if i % 6 < 5 and new_pos[i + 1] == 'R':
-                    new_pos[i] = 'm'
+        board = ['-'] * 36
+        found = []
+        for cell, allowed_pieces in HASH_DIGITS[red_col]:
+            hash_val, digit = divmod(hash_val, len(allowed_pieces))
+            if digit:
+                board[cell] = allowed_pieces[digit]
+                found.append(cell)
+        # Every piece covers one of every other cell, or two for pieces of
+        # length 3, so it can be placed from those cells
+        pieces = [RED << 6 | (12 + red_col)]
+        for cell in found:
+            piece = board[cell]
+            if piece == 'L':
+                if cell % 6 < 4 and board[cell + 2] == 'R':
+                    pieces.append(HORIZONTAL_3 << 6 | cell)
                 else:
-                    new_pos[i] = 'R'
-            elif i % 6 < 5 and new_pos[i + 1] in {'R', 'm'}:
-                new_pos[i] = 'L'
-            elif i >= 6 and new_pos[i - 6] in {'T', 'M'}:
-                if i < 30 and new_pos[i + 6] == 'B':
-                    new_pos[i] = 'M'
+                    pieces.append(HORIZONTAL_2 << 6 | cell)
+            elif piece == 'm':
+                pieces.append(HORIZONTAL_3 << 6 | (cell - 1))
+            elif piece == 'R':
+                if cell % 6 < 2 or board[cell - 2] != 'L':
+                    pieces.append(HORIZONTAL_2 << 6 | (cell - 1))
+            elif piece == 'T':
+                if cell < 24 and board[cell + 12] == 'B':
+                    pieces.append(VERTICAL_3 << 6 | cell)
                 else:
-                    new_pos[i] = 'B'
-            elif i < 30 and new_pos[i + 6] in {'B', 'M'}:
-                new_pos[i] = 'T'
-        return RushHour(variantid, pos=''.join(new_pos))
+                    pieces.append(VERTICAL_2 << 6 | cell)
+            elif piece == 'M':
+                pieces.append(VERTICAL_3 << 6 | (cell - 6))
+            elif cell < 12 or board[cell - 12] != 'T':
+                pieces.append(VERTICAL_2 << 6 | (cell - 6))
+        return cls.fromPieces(variantid, tuple(pieces), sum(MASKS[code] for code in pieces))
 
     def toString(self, mode):
         if mode == StringMode.HUMAN_READABLE_MULTILINE:
@@ -239,94 +347,53 @@ class RushHour(ServerPuzzle):
         return RushHour(variant_id=variant_id, pos=board_string)
 
     def primitive(self, **kwargs):
-        if self.pos[16:18] == "12":
+        if self.pieces[0] == RED_EXIT:
             return PuzzleValue.SOLVABLE
         return PuzzleValue.UNDECIDED
 
     def generateMoves(self, movetype="all"):
         if movetype == 'for' or movetype == 'back':
             return []  # All moves are bidirectional
+        # A move is the index of the piece in self.pieces << 9 | its new code.
+        # See moveString for their AutoGUI representation.
         moves = []
-        for i, piece in enumerate(self.pos[:36]):
-            # Check for leftward moves
-            if piece in {'1', 'L'}:
-                j = 0
-                while (i - j) % 6 > 0 and self.pos[i - j - 1] == '-':
-                    j += 1
-                    if i == 16:
-                        # If it's a leftward move from a winning position,
-                        # display it as though it is coming from outside the grid
-                        moves.append(f"M_{36}_{i-j}_x")
-                    else:
-                        moves.append(f"M_{i}_{i-j}_x")
-            # Check for rightward moves
-            elif piece in {'R', '2'}:
-                j = 0
-                while (i + j) % 6 < 5 and self.pos[i + j + 1] == '-':
-                    j += 1
-                    if i + j == 17:
-                        # If it's a rightward move to a winning position,
-                        # display it as though it is going outside the grid
-                        moves.append(f"M_{i}_{36}_x")
-                    else:
-                        moves.append(f"M_{i}_{i+j}_x")
-            # Check for upward moves
-            elif piece == 'T':
-                j = 1
-                while i - 6 * j >= 0 and self.pos[i - 6*j] == '-':
-                    moves.append(f"M_{i}_{i-6*j}_x")
-                    j += 1
-            # Check for downward moves
-            elif piece == 'B':
-                j = 1
-                while i + 6 * j < 36 and self.pos[i + 6*j] == '-':
-                    moves.append(f"M_{i}_{i+6*j}_x")
-                    j += 1
+        occupied = self.occupied
+        for i, code in enumerate(self.pieces):
+            for ray in RAYS[code]:
+                for bit, new_code in ray:
+                    if occupied & bit:
+                        break
+                    moves.append(i << 9 | new_code)
         return moves
 
     def doMove(self, move, **kwargs):
         if move not in self.generateMoves():
             raise ValueError
-        _, start, end, _ = move.split("_")
-        start = int(start)
-        end = int(end)
-        # If the move is to/from a winning position, adjust to the true destination (see generateMoves)
-        if start == 36: start = 16
-        if end == 36: end = 17
-        new_pos = list(self.pos)
-        # First check the move's orientation to know which way to move
-        if end >= start + 6:
-            # Downward move, meaning `start` is a 'B' square. Find the entire piece's length to determine what to move.
-            length = 2 + (start >= 12 and self.pos[start - 12] == 'T')
-            # Move the vertical slice containing the piece, down to the end of the move
-            new_pos[(end - 6*(length-1)):(end + 1):6] = self.pos[(start - 6*(length-1)):(start + 1):6]
-            # Replace vacated squares by empty '-'
-            distance = (end - start) // 6
-            new_pos[(start - 6*(length-1)):(end - 6*(length-1)):6] = ['-'] * distance
-        elif end > start:
-            # Rightward move, meaning `start` is a 'R' square.
-            length = 2 + (start % 6 >= 2 and self.pos[start - 2] == 'L')
-            new_pos[(end - length + 1):(end + 1)] = self.pos[(start - length + 1):(start + 1)]
-            distance = end - start
-            new_pos[(start - length + 1):(end - length + 1)] = ['-'] * distance
-        elif end <= start - 6:
-            # Upward move, meaning `start` is a 'T' square.
-            length = 2 + (start < 24 and self.pos[start + 12] == 'B')
-            new_pos[end:(end + 6*length):6] = self.pos[start:(start + 6*length):6]
-            distance = (start - end) // 6
-            new_pos[(end + 6*length):(start + 6*length):6] = ['-'] * distance
-        else:
-            # Leftward move, meaning `start` is a 'L' square.
-            length = 2 + (start % 6 < 4 and self.pos[start + 2] == 'R')
-            new_pos[end:(end + length)] = self.pos[start:(start + length)]
-            distance = start - end
-            new_pos[(end + length):(start + length)] = ['-'] * distance
-
-        return RushHour(variant_id=self.variant_id, pos=''.join(new_pos))
-    
+        return self.doMoveUnchecked(move)
+
+    def doMoveUnchecked(self, move, **kwargs):
+        i, new_code = move >> 9, move & 511
+        pieces = self.pieces
+        occupied = self.occupied ^ MASKS[pieces[i]] ^ MASKS[new_code]
+        return RushHour.fromPieces(self.variant_id, pieces[:i] + (new_code,) + pieces[i + 1:], occupied)
+
     def moveString(self, move, mode):
+        # The move goes from the cell of the piece at the front of the move
+        # to the cell it lands on
+        code, new_code = self.pieces[move >> 9], move & 511
+        kind = code >> 6
+        start, end = code & 63, new_code & 63
+        if new_code > code:
+            # Rightward or downward move
+            start += STEPS[kind] * (len(PIECES[kind]) - 1)
+            end += STEPS[kind] * (len(PIECES[kind]) - 1)
+        # Moves to/from a winning position are displayed as though the red
+        # piece is going outside the grid
+        if kind == RED and end == 17:
+            end = 36
+        if kind == RED and start == 16 and end < start:
+            start = 36
         if mode == StringMode.AUTOGUI:
-            return move
+            return f'M_{start}_{end}_x'
         else:
-            parts = move.split('_')
-            return f'{parts[1]} {parts[2]}'
+            return f'{start} {end}'
@@ -8,19 +8,71 @@ Date: April 25, 2020
 from . import ServerPuzzle
 from ..util import *
 
+def _moveTables(num_frogstoads):
+    """Returns the forward and undo moves of every position of the variant,
+    indexed by (blank index << 4) | window, where the window holds the bits
+    of the two pieces on either side of the blank (see __hash__). A move is
+    the board index of the piece that moves into the blank."""
+    forward, undo = [], []
+    for blank in range(num_frogstoads + 1):
+        for window in range(16):
+            def cell(idx):
+                # Piece at board index idx, None if off the board
+                if not 0 <= idx <= num_frogstoads or idx == blank:
+                    return None
+                bit = idx if idx < blank else idx - 1
+                return 'x' if window >> (bit - blank + 2) & 1 else 'o'
+            for moves, piece, other in ((forward, 'x', 'o'), (undo, 'o', 'x')):
+                # Toads ('x') move right and frogs ('o') move left, the other
+                # way around when undoing
+                moves.append(tuple(move for move, ok in (
+                    (blank - 1, cell(blank - 1) == piece),
+                    (blank + 1, cell(blank + 1) == other),
+                    (blank - 2, cell(blank - 2) == piece and cell(blank - 1) == other),
+                    (blank + 2, cell(blank + 2) == other and cell(blank + 1) == piece),
+                ) if ok))
+    return {
+        'for': forward,
+        'undo': undo,
+        'all': [f + u for f, u in zip(forward, undo)]
+    }
+
 class ToadsAndFrogsPuzzle(ServerPuzzle):
 
     id      = 'toadsandfrogspuzzle'
-    variants = ["4", "6", "8", "10"] # Number of frogs and toads total, must be even
+    variants = ["4", "6", "8", "10", "12", "14", "16", "18", "20"] # Number of frogs and toads total, must be even
+    # Only a few of the (n + 1) << n hashes of these variants are reachable,
+    # too few for an IndexSolver database
+    sparse_variants = ["18", "20"]
     startRandomized = False
 
+    # Move tables of every variant, built on first use
+    _tables = {}
+
     def __init__(self, variant_id, **kwargs):
         self.num_frogstoads = int(variant_id)
-        self.board = ['x'] * (self.num_frogstoads >> 1) + ['-'] + ['o'] * (self.num_frogstoads >> 1)
+        half = self.num_frogstoads >> 1
+        # The position is its hash: toads on the left, frogs on the right
+        self.position = (half << self.num_frogstoads) | ((1 << half) - 1)
+
+    @classmethod
+    def _fromPosition(cls, num_frogstoads, position):
+        puzzle = cls.__new__(cls)
+        puzzle.num_frogstoads = num_frogstoads
+        puzzle.position = position
+        return puzzle
 
     def __str__(self, **kwargs):
         return str(self.board)
 
+    @property
+    def board(self):
+        """The position as a list of 'x' (toads), 'o' (frogs) and '-'"""
+        n = self.num_frogstoads
+        board = ['x' if self.position >> i & 1 else 'o' for i in range(n)]
+        board.insert(self.position >> n, '-')
+        return board
+
     @property
     def variant(self):
         """Returns a string defining the variant of this puzzleself.
@@ -28,78 +80,68 @@ class ToadsAndFrogsPuzzle(ServerPuzzle):
         """
         return str(self.num_frogstoads)
 
+    @property
+    def numPositions(self):
+        return (self.num_frogstoads + 1) << self.num_frogstoads
+
+    def _solution(self):
+        # Frogs on the left, toads on the right
+        half = self.num_frogstoads >> 1
+        return (half << self.num_frogstoads) | (((1 << half) - 1) << half)
+
     def primitive(self, **kwargs):
-        if self.board == ['o'] * (self.num_frogstoads >> 1) + ['-'] + ['x'] * (self.num_frogstoads >> 1):
+        if self.position == self._solution():
             return PuzzleValue.SOLVABLE
         return PuzzleValue.UNDECIDED
 
     # Generate Legal Moves & all undo moves
     def generateMoves(self, movetype="all", **kwargs):
-        moves = []
         if movetype=='bi':
             return []
-        pad_amount = 2
-        padded_board = ['p', 'p'] + self.board[:] + ['p', 'p']
-        blank_idx = padded_board.index('-')
-        if movetype in ('for', 'legal', 'all'):
-            if padded_board[blank_idx - 1] == 'x':
-                moves.append(blank_idx - 1 - pad_amount)
-            if padded_board[blank_idx + 1] == 'o':
-                moves.append(blank_idx + 1 - pad_amount)
-            if padded_board[blank_idx - 2] == 'x' and padded_board[blank_idx - 1] == 'o':
-                moves.append(blank_idx - 2 - pad_amount)
-            if padded_board[blank_idx + 2] == 'o' and padded_board[blank_idx + 1] == 'x':
-                moves.append(blank_idx + 2 - pad_amount)
-        if movetype in ('undo', 'back', 'all'):
-            if padded_board[blank_idx - 1] == 'o':
-                moves.append(blank_idx - 1 - pad_amount)
-            if padded_board[blank_idx + 1] == 'x':
-                moves.append(blank_idx + 1 - pad_amount)
-            if padded_board[blank_idx - 2] == 'o' and padded_board[blank_idx - 1] == 'x':
-                moves.append(blank_idx - 2 - pad_amount)
-            if padded_board[blank_idx + 2] == 'x' and padded_board[blank_idx + 1] == 'o':
-                moves.append(blank_idx + 2 - pad_amount)
-            
-        return moves
+        if movetype in ('for', 'legal'):
+            movetype = 'for'
+        elif movetype in ('undo', 'back'):
+            movetype = 'undo'
+        elif movetype != 'all':
+            return []
+        n = self.num_frogstoads
+        tables = ToadsAndFrogsPuzzle._tables.get(n)
+        if tables is None:
+            tables = ToadsAndFrogsPuzzle._tables[n] = _moveTables(n)
+        blank = self.position >> n
+        window = ((self.position & ((1 << n) - 1)) << 2 >> blank) & 15
+        return list(tables[movetype][blank << 4 | window])
 
     def doMove(self, move, **kwargs):
         if move not in self.generateMoves(): raise ValueError
-        newPuzzle = ToadsAndFrogsPuzzle(str(self.num_frogstoads))
-        new_board = self.board[:]
-        new_board[new_board.index('-')] = new_board[move]
-        new_board[move] = '-'
-        newPuzzle.board = new_board
-        return newPuzzle
+        return self.doMoveUnchecked(move)
+
+    def doMoveUnchecked(self, move, **kwargs):
+        n = self.num_frogstoads
+        blank = self.position >> n
+        bits = self.position & ((1 << n) - 1)
+        # A slide keeps the order of the pieces, a jump swaps the jumping
+        # piece with the one it jumps over
+        if move == blank - 2:
+            bits ^= 3 << move
+        elif move == blank + 2:
+            bits ^= 3 << blank
+        return ToadsAndFrogsPuzzle._fromPosition(n, (move << n) | bits)
 
     ### ____________ Solver Funcs ________________
 
     def __hash__(self):
-        h = 0
-        copy = self.board[:]
-        blank_idx = copy.index('-')
-        copy.pop(blank_idx)
-        for i in range(self.num_frogstoads):
-            if copy[i] == 'x':
-                h |= (1 << i)
-        return (blank_idx << self.num_frogstoads) | h
+        # (blank index << num_frogstoads) | bitmask of the toads, where bit i
+        # is the i-th piece from the left, skipping over the blank
+        return self.position
 
     def generateSolutions(self, **kwargs):
-        newPuzzle = ToadsAndFrogsPuzzle(str(self.num_frogstoads))
-        newPuzzle.board = ['o'] * (self.num_frogstoads >> 1) + ['-'] + ['x'] * (self.num_frogstoads >> 1)
-        return [newPuzzle]
+        return [ToadsAndFrogsPuzzle._fromPosition(self.num_frogstoads, self._solution())]
 
     ### ________ Server _________
     @classmethod
     def fromHash(cls, variantid, hash_val):
-        puzzle = cls(variantid)
-        board = []
-        for i in range(puzzle.num_frogstoads):
-            if hash_val & (1 << i):
-                board.append('x')
-            else:
-                board.append('o')
-        board.insert(hash_val >> puzzle.num_frogstoads, '-')
-        return puzzle
+        return cls._fromPosition(int(variantid), hash_val)
 
     @classmethod
     def fromString(cls, variant_id, positionid):
@@ -111,10 +153,16 @@ class ToadsAndFrogsPuzzle(ServerPuzzle):
         Outputs:
             Puzzle object based on puzzleid and variantid
         """
-        board = list(positionid.split('_')[-1])
-        puzzle = ToadsAndFrogsPuzzle(variant_id)
-        puzzle.board = board
-        return puzzle
+        board = positionid.split('_')[-1]
+        n = int(variant_id)
+        if len(board) != n + 1 or board.count('-') != 1 or set(board) - set('xo-'):
+            raise ValueError("Invalid positionid")
+        blank = board.index('-')
+        bits = 0
+        for i, piece in enumerate(board[:blank] + board[blank + 1:]):
+            if piece == 'x':
+                bits |= 1 << i
+        return cls._fromPosition(n, (blank << n) | bits)
     
     def moveString(self, move, mode):
         if mode == StringMode.AUTOGUI:
@@ -70,6 +70,9 @@ class TopSpin(ServerPuzzle):
 	def doMove(self, move, **kwargs):
 		if move not in self.generateMoves():
 			raise ValueError
+		return self.doMoveUnchecked(move)
+
+	def doMoveUnchecked(self, move, **kwargs):
 		new_loop = [0 for _ in range(self.size)]
 		if len(move) == 2:
 			idx_change = move[0]
@@ -83,13 +86,7 @@ class TopSpin(ServerPuzzle):
 
 	def __hash__(self):
 		# Returns the permutation index of self.loop
-		h = 0
-		nums = list(range(1, self.size + 1))
-		for i in range(self.size):
-			j = nums.index(self.loop[i])
-			del nums[j]
-			h += j * math.factorial(self.size - i - 1)
-		return h
+		return permutationRank([num - 1 for num in self.loop])
 
 	def generateSolutions(self, **kwargs):
 		solutions = []
@@ -104,17 +101,17 @@ class TopSpin(ServerPuzzle):
 		var = size + '_' + spin
 		return var
 
+	@property
+	def numPositions(self):
+		# The hash is the permutation index of the loop
+		return math.factorial(self.size)
+
 	@classmethod
 	def fromHash(cls, variantid, hash_val):
 		temp = variantid.split('_')
 		size = int(temp[0])
 		spin = int(temp[1])
-		loop = []
-		nums = list(range(1, size+1))
-		for i in range(size):
-			numPermutation = math.factorial(size - i -1)
-			loop.append(nums.pop(hash_val // numPermutation))
-			hash_val %= numPermutation
+		loop = [num + 1 for num in permutationUnrank(size, hash_val)]
 		return cls(size, spin, loop=loop)
 
 	@classmethod
@@ -12,6 +12,9 @@ ISolver = IndexSolver
 from .picklesolver import PickleSolver
 PSolver = PickleSolver
 
+from .parallelsolver import ParallelSolver
+ParSolver = ParallelSolver
+
 from .lightsoutclosedformsolver import LightsOutClosedFormSolver
 LOCFSolver = LightsOutClosedFormSolver
 
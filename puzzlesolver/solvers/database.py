@@ -0,0 +1,343 @@
+import mmap
+import os
+import random
+import struct
+import sys
+import gzip
+from array import array
+from bisect import bisect_left
+import numpy as np
+from .tables import DenseTable
+from ..util import PuzzleValue
+
+def pack_nibbles(values):
+    """Packs a uint8 array (or bytes-like) of values below 16 two to a byte:
+    value i goes into the low nibble of byte i // 2 if i is even, the high
+    nibble if odd. Returns a uint8 array."""
+    values = np.frombuffer(values, dtype=np.uint8) if not isinstance(values, np.ndarray) else values
+    if len(values) % 2:
+        values = np.append(values, np.uint8(0))
+    return values[0::2] | (values[1::2] << 4)
+
+def unpack_nibbles(packed, count=None):
+    """Inverse of pack_nibbles. Returns a uint8 array of the first count
+    (by default all) values held by packed."""
+    packed = np.frombuffer(packed, dtype=np.uint8) if not isinstance(packed, np.ndarray) else packed
+    values = np.empty(2 * len(packed), dtype=np.uint8)
+    values[0::2] = packed & 0xF
+    values[1::2] = packed >> 4
+    return values[:count]
+
+class IndexDatabase:
+    """
+    Read-only view of a remoteness database where the hash of a position is
+    the index of its entry. The file is memory-mapped, so opening it is O(1)
+    and every process serving it shares the same page cache.
+
+    Layout (little-endian):
+        - a 128 byte header: magic, format version, bits per entry, hash
+          version of the puzzle (see Puzzle.hash_version), max hash (-1 for
+          an empty table), number of solvable hashes, puzzle id and variant
+        - (max hash + 1) unsigned entries of `width` (4, 8, 16 or 32) bits
+          each, where the all-ones value marks a position that cannot reach
+          a solution. The writer picks the smallest width that fits the
+          largest remoteness of the table. 4 bit entries are packed two to a
+          byte (see pack_nibbles).
+
+    The gzipped one-byte-per-hash files of older IndexSolvers (`.bin.gz`)
+    can still be opened, but they are decompressed into memory. They were
+    all solved with hash version 0.
+    """
+    HEADER = struct.Struct('<8sHHIqQ48s48s')
+    MAGIC = b'GMPINDEX'
+    VERSION = 1
+    LEGACY_UNSOLVABLE = 127
+    TYPECODES = {4: 'B', 8: 'B', 16: 'H', 32: 'I'}
+    DTYPES = {4: '<u1', 8: '<u1', 16: '<u2', 32: '<u4'}
+    CHUNK = 1 << 20
+    SAMPLE_TRIES = 32
+
+    def __init__(self, path):
+        self.path = path
+        if path.endswith('.gz'):
+            with gzip.open(path, 'rb') as fo:
+                self._buffer = fo.read()
+            self.puzzle_id, self.variant = None, None
+            self.width, self.max_hash = 8, len(self._buffer) - 1
+            self.solvable_count = None
+            self.hash_version = 0
+            self._entries = memoryview(self._buffer)
+            self._unsolvable = IndexDatabase.LEGACY_UNSOLVABLE
+            return
+
+        with open(path, 'rb') as fo:
+            self._buffer = mmap.mmap(fo.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, width, hash_version, max_hash, solvable_count, puzzle_id, variant = \
+            IndexDatabase.HEADER.unpack_from(self._buffer)
+        if magic != IndexDatabase.MAGIC or version != IndexDatabase.VERSION:
+            self.close()
+            raise ValueError("{} is not an index database".format(path))
+        if width not in IndexDatabase.TYPECODES:
+            self.close()
+            raise ValueError("Unsupported entry width {}".format(width))
+        self.puzzle_id = puzzle_id.rstrip(b'\0').decode()
+        self.variant = variant.rstrip(b'\0').decode()
+        self.width, self.max_hash = width, max_hash
+        # 0 in the databases written before it was recorded
+        self.hash_version = hash_version
+        # Not recorded by the first databases of this format
+        self.solvable_count = solvable_count or None
+        self._unsolvable = (1 << width) - 1
+
+        start = IndexDatabase.HEADER.size
+        entries = memoryview(self._buffer)[start:start + ((max_hash + 1) * width + 7) // 8]
+        if sys.byteorder == 'little':
+            self._entries = entries.cast(IndexDatabase.TYPECODES[width])
+        else:
+            # Entries are little-endian, so they can't be read in place
+            self._entries = array(IndexDatabase.TYPECODES[width], entries)
+            self._entries.byteswap()
+            entries.release()
+
+    def __len__(self):
+        return self.max_hash + 1
+
+    def __getitem__(self, h):
+        """Returns the remoteness stored for hash h, PuzzleValue.MAX_REMOTENESS
+        if the position cannot reach a solution."""
+        if h < 0 or h > self.max_hash:
+            return PuzzleValue.MAX_REMOTENESS
+        remoteness = self._raw(h)
+        if remoteness == self._unsolvable:
+            return PuzzleValue.MAX_REMOTENESS
+        return remoteness
+
+    def _raw(self, h):
+        if self.width == 4:
+            return (self._entries[h >> 1] >> ((h & 1) << 2)) & 0xF
+        return self._entries[h]
+
+    def entries(self, start=0, stop=None):
+        """Returns the raw entries of hashes start to stop - 1 (by default all
+        of them) as a numpy array. Unsolvable positions hold the all-ones
+        value of the width."""
+        stop = len(self) if stop is None else stop
+        if self.path.endswith('.gz'):
+            return np.frombuffer(self._buffer, dtype=np.uint8)[start:stop]
+        width, offset = self.width, IndexDatabase.HEADER.size
+        if width == 4:
+            packed = np.frombuffer(self._buffer, dtype=np.uint8,
+                count=(stop + 1) // 2 - start // 2, offset=offset + start // 2)
+            return unpack_nibbles(packed)[start % 2:start % 2 + stop - start]
+        return np.frombuffer(self._buffer, dtype=IndexDatabase.DTYPES[width],
+            count=stop - start, offset=offset + start * width // 8).copy()
+
+    def _chunks(self):
+        """Yields (first hash, entries) for consecutive chunks of the table"""
+        for start in range(0, len(self), IndexDatabase.CHUNK):
+            yield start, self.entries(start, min(start + IndexDatabase.CHUNK, len(self)))
+
+    def solvable(self):
+        """Returns a numpy array of every hash that can reach a solution"""
+        return np.flatnonzero(self.entries() != self._unsolvable)
+
+    def count_solvable(self):
+        """Number of hashes that can reach a solution"""
+        if self.solvable_count is None:
+            self.solvable_count = sum(int(np.count_nonzero(chunk != self._unsolvable))
+                for _, chunk in self._chunks())
+        return self.solvable_count
+
+    def random_solvable(self, rng=random):
+        """Returns a hash drawn uniformly from the hashes that can reach a
+        solution, without building a list of them.
+
+        Draws random hashes until one is solvable. If SAMPLE_TRIES draws miss
+        (i.e. solvable hashes are sparse), picks the k-th solvable hash
+        instead, counting them a chunk of the table at a time.
+        """
+        count = self.count_solvable()
+        if count == 0:
+            raise IndexError("No solvable hash in {}".format(self.path))
+        for _ in range(IndexDatabase.SAMPLE_TRIES):
+            h = rng.randrange(len(self))
+            if self._raw(h) != self._unsolvable:
+                return h
+        k = rng.randrange(count)
+        for start, chunk in self._chunks():
+            solvable = chunk != self._unsolvable
+            n = int(np.count_nonzero(solvable))
+            if k < n:
+                return start + int(np.flatnonzero(solvable)[k])
+            k -= n
+
+    def close(self):
+        if isinstance(getattr(self, '_entries', None), memoryview):
+            self._entries.release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    @staticmethod
+    def write(path, puzzle_id, variant, remoteness, hash_version=0):
+        """Writes the dict-like remoteness table (hash -> remoteness) to path.
+        The file is written next to path and moved in place, so processes
+        that already mapped an older version keep reading a complete file.
+        """
+        if isinstance(remoteness, DenseTable):
+            hashes, values = remoteness.arrays()
+        else:
+            hashes = np.fromiter(remoteness.keys(), dtype=np.int64, count=len(remoteness))
+            values = np.fromiter(remoteness.values(), dtype=np.int64, count=len(remoteness))
+        if len(hashes) and hashes.min() < 0:
+            raise ValueError("Negative hash {} cannot index a database".format(int(hashes.min())))
+        # An empty table is written with no entries at all
+        max_hash = int(hashes.max()) if len(hashes) else -1
+        max_remoteness = int(values.max()) if len(values) else 0
+        for width in sorted(IndexDatabase.TYPECODES):
+            unsolvable = (1 << width) - 1
+            if max_remoteness < unsolvable:
+                break
+        else:
+            raise ValueError("Remoteness {} does not fit in an entry".format(max_remoteness))
+
+        entries = np.full(max_hash + 1, unsolvable, dtype=IndexDatabase.DTYPES[width])
+        entries[hashes] = values
+        if width == 4:
+            entries = pack_nibbles(entries)
+        header = IndexDatabase.HEADER.pack(
+            IndexDatabase.MAGIC, IndexDatabase.VERSION, width, hash_version, max_hash, len(remoteness),
+            puzzle_id.encode(), str(variant).encode())
+        tmp_path = '{}.tmp'.format(path)
+        with open(tmp_path, 'wb') as fo:
+            fo.write(header)
+            entries.tofile(fo)
+        os.replace(tmp_path, path)
+
+class SortedDatabase:
+    """
+    Read-only view of a remoteness database that only stores the positions
+    that can reach a solution, for hash spaces too sparse to be used as
+    indices (see IndexDatabase). The file is memory-mapped too, and a hash
+    is looked up with a binary search.
+
+    Layout (little-endian):
+        - a 128 byte header: magic, format version, bits per hash, bits per
+          entry, hash version of the puzzle, number of hashes, puzzle id and
+          variant
+        - the hashes, in increasing order, as unsigned 32 bit integers if
+          they all fit, else as signed 64 bit integers
+        - the remoteness of every hash, in the same order, in the smallest
+          width (4, 8, 16 or 32 bits) that fits the largest one. 4 bit
+          entries are packed two to a byte (see pack_nibbles).
+    """
+    HEADER = struct.Struct('<8sHHHHQ48s48s8x')
+    MAGIC = b'GMPSORTD'
+    VERSION = 1
+    HASH_TYPECODES = {32: 'I', 64: 'q'}
+    HASH_DTYPES = {32: '<u4', 64: '<i8'}
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fo:
+            self._buffer = mmap.mmap(fo.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, hash_bits, width, hash_version, count, puzzle_id, variant = \
+            SortedDatabase.HEADER.unpack_from(self._buffer)
+        if magic != SortedDatabase.MAGIC or version != SortedDatabase.VERSION:
+            self.close()
+            raise ValueError("{} is not a sorted database".format(path))
+        if hash_bits not in SortedDatabase.HASH_TYPECODES or width not in IndexDatabase.TYPECODES:
+            self.close()
+            raise ValueError("Unsupported hash or entry width {}, {}".format(hash_bits, width))
+        self.puzzle_id = puzzle_id.rstrip(b'\0').decode()
+        self.variant = variant.rstrip(b'\0').decode()
+        self.hash_bits, self.width, self.count = hash_bits, width, count
+        self.hash_version = hash_version
+
+        start = SortedDatabase.HEADER.size
+        self._values_offset = start + count * hash_bits // 8
+        self._hashes = self._view(start, count * hash_bits // 8, SortedDatabase.HASH_TYPECODES[hash_bits])
+        self._entries = self._view(self._values_offset, (count * width + 7) // 8, IndexDatabase.TYPECODES[width])
+
+    def _view(self, start, size, typecode):
+        view = memoryview(self._buffer)[start:start + size]
+        if sys.byteorder == 'little':
+            return view.cast(typecode)
+        # Entries are little-endian, so they can't be read in place
+        values = array(typecode, view)
+        values.byteswap()
+        view.release()
+        return values
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, h):
+        """Returns the remoteness stored for hash h, PuzzleValue.MAX_REMOTENESS
+        if the position cannot reach a solution."""
+        i = bisect_left(self._hashes, h)
+        if i == self.count or self._hashes[i] != h:
+            return PuzzleValue.MAX_REMOTENESS
+        if self.width == 4:
+            return (self._entries[i >> 1] >> ((i & 1) << 2)) & 0xF
+        return self._entries[i]
+
+    def random_solvable(self, rng=random):
+        """Returns a hash drawn uniformly from the stored hashes, which can
+        all reach a solution"""
+        if self.count == 0:
+            raise IndexError("No solvable hash in {}".format(self.path))
+        return self._hashes[rng.randrange(self.count)]
+
+    def arrays(self):
+        """Returns the hashes in increasing order and their remotenesses, as
+        two int64 numpy arrays"""
+        hashes = np.frombuffer(self._buffer, dtype=SortedDatabase.HASH_DTYPES[self.hash_bits],
+            count=self.count, offset=SortedDatabase.HEADER.size)
+        if self.width == 4:
+            values = unpack_nibbles(np.frombuffer(self._buffer, dtype=np.uint8,
+                count=(self.count + 1) // 2, offset=self._values_offset), self.count)
+        else:
+            values = np.frombuffer(self._buffer, dtype=IndexDatabase.DTYPES[self.width],
+                count=self.count, offset=self._values_offset)
+        return hashes.astype(np.int64), values.astype(np.int64)
+
+    def close(self):
+        for view in (getattr(self, '_hashes', None), getattr(self, '_entries', None)):
+            if isinstance(view, memoryview):
+                view.release()
+        self._buffer.close()
+
+    @staticmethod
+    def write(path, puzzle_id, variant, remoteness, hash_version=0):
+        """Writes the dict-like remoteness table (hash -> remoteness) to path.
+        The file is written next to path and moved in place, like
+        IndexDatabase.write."""
+        if isinstance(remoteness, DenseTable):
+            hashes, values = remoteness.arrays()
+        else:
+            hashes = np.fromiter(remoteness.keys(), dtype=np.int64, count=len(remoteness))
+            values = np.fromiter(remoteness.values(), dtype=np.int64, count=len(remoteness))
+        order = np.argsort(hashes, kind='stable')
+        hashes, values = hashes[order], values[order]
+
+        fits32 = not len(hashes) or (hashes[0] >= 0 and hashes[-1] < 1 << 32)
+        hash_bits = 32 if fits32 else 64
+        max_remoteness = int(values.max()) if len(values) else 0
+        for width in sorted(IndexDatabase.TYPECODES):
+            if max_remoteness < 1 << width:
+                break
+        else:
+            raise ValueError("Remoteness {} does not fit in an entry".format(max_remoteness))
+
+        entries = values.astype(IndexDatabase.DTYPES[width])
+        if width == 4:
+            entries = pack_nibbles(entries)
+        header = SortedDatabase.HEADER.pack(
+            SortedDatabase.MAGIC, SortedDatabase.VERSION, hash_bits, width, hash_version, len(hashes),
+            str(puzzle_id).encode(), str(variant).encode())
+        tmp_path = '{}.tmp'.format(path)
+        with open(tmp_path, 'wb') as fo:
+            fo.write(header)
+            hashes.astype(SortedDatabase.HASH_DTYPES[hash_bits]).tofile(fo)
+            entries.tofile(fo)
+        os.replace(tmp_path, path)
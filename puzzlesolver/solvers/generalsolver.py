@@ -1,8 +1,13 @@
 from .solver import Solver
+from .tables import DenseTable, HashSet, remotenessTable
 from ..util import PuzzleValue
+from array import array
+import numpy as np
 import queue as q
 import progressbar
+import pickle
 import time
+import os
 
 class GeneralSolver(Solver):
     def __init__(self, puzzle):
@@ -23,6 +28,9 @@ class GeneralSolver(Solver):
         if not isinstance(puzzle, Puzzle): 
             raise TypeError("Not a Puzzle instance")
         
+        # Replaced by an array indexed by hash when solving puzzles with a
+        # bounded hash (see _newTable), so that solvers that only read a
+        # database don't allocate one
         self._remoteness = {}
         self._queue = q.Queue()
         self.puzzle = puzzle
@@ -57,29 +65,62 @@ class GeneralSolver(Solver):
 
         if not self.solved:
             raise SystemError("Solver has not been solved yet")
-        if hash(puzzle) in self._remoteness:
-            return self._remoteness[hash(puzzle)]
-        return PuzzleValue.MAX_REMOTENESS
+        return self._remoteness.get(hash(puzzle), PuzzleValue.MAX_REMOTENESS)
 
-    def solve(self, verbose=False):
-        """Solves the puzzle inputted into the solver during initialization.
+    def getRemotenesses(self, puzzles):
+        """Same as getRemoteness, for every Puzzle instance of puzzles"""
+        from puzzlesolver.puzzles import Puzzle
 
-        TODO: Be able to handle interrupts, so that when even if a solver is
-        interrupted during solving, as long as its in memory, it is able to continue
-        solving the rest of the positions with no errors.
+        puzzles = list(puzzles)
+        if not all(isinstance(puzzle, Puzzle) for puzzle in puzzles):
+            raise TypeError("Not a Puzzle instance")
+
+        if not self.solved:
+            raise SystemError("Solver has not been solved yet")
+        get = self._remoteness.get
+        return [get(hash(puzzle), PuzzleValue.MAX_REMOTENESS) for puzzle in puzzles]
+
+    def solve(self, verbose=False, checkpoint_path=None, checkpoint_interval=0, resume=False, single_pass=False):
+        """Solves the puzzle inputted into the solver during initialization.
 
         Parameters
         ----------
         verbose : bool, optional
             Displays a neat little progressbar during solving.
             Maxlength is based on puzzle.numPositions if defined, by default False
+        checkpoint_path : str, optional
+            If given, the remoteness table and the BFS frontier are saved to this
+            file whenever a level of the BFS is completed, so that an interrupted
+            solve can be resumed. The file is deleted once the solve is done.
+            Only puzzles that are solved over hashes (see _hashFrontier) are
+            checkpointed.
+        checkpoint_interval : float, optional
+            Minimum number of seconds between two checkpoints, by default 0
+            (after every level)
+        resume : bool, optional
+            Continue from the checkpoint at checkpoint_path, if there is one,
+            instead of starting over. By default False
+        single_pass : bool, optional
+            Solve CSPs (puzzles without generateSolutions) with a single
+            traversal, see _cspSolve. Only positions reachable from the
+            starting position are then classified. By default False
         """
         if not isinstance(self._queue, q.Queue):
             self._queue = q.Queue()
+        if type(self._remoteness) is dict and not self._remoteness:
+            self._remoteness = self._newTable()
+
+        checkpoint = None
+        if resume and checkpoint_path is not None:
+            checkpoint = self._loadCheckpoint(checkpoint_path)
 
-        if self._queue.empty():
-            solutions = self.puzzle.generateSolutions()
-            if len(list(solutions)) == 0:
+        if checkpoint is None and self._queue.empty():
+            solutions = list(self.puzzle.generateSolutions())
+            if len(solutions) == 0 and single_pass:
+                # CSP - classify the positions reachable from the starting position
+                self._cspSolve(verbose)
+                return
+            elif len(solutions) == 0:
                 # CSP - the position generated by the __init__ method is starting position
                 self._cspGenerateSolutions(self._queue, verbose)
             else:
@@ -95,21 +136,89 @@ class GeneralSolver(Solver):
             print('Solving {} (Variant {})...'.format(self.puzzle.id, self.puzzle.variant))
             bar = progressbar.ProgressBar(max_value=self.puzzle.numPositions)
 
-        # BFS for remoteness classification                        
-        while not self._queue.empty():
-            if verbose: bar.update(len(self._remoteness))
-            puzzle = self._queue.get()
-            for move in puzzle.generateMoves('undo'):
-                nextPuzzle = puzzle.doMove(move)
-
-                if hash(nextPuzzle) not in self._remoteness:
-                    assert nextPuzzle.primitive() != PuzzleValue.SOLVABLE, """
-                        Found a state where primitive was SOLVABLE while traversing Puzzle tree
-                    """
-                    self._remoteness[hash(nextPuzzle)] = self._remoteness[hash(puzzle)] + 1
-                    self._queue.put(nextPuzzle)
+        if checkpoint is not None:
+            level, frontier = checkpoint
+        else:
+            level, frontier = 0, self._hashFrontier()
+        if frontier is not None:
+            # Level-synchronous BFS over integer hashes
+            self._queue = q.Queue()
+            lastCheckpoint = time.monotonic()
+            while frontier:
+                level += 1
+                frontier = self._expandLevel(frontier, level)
+                if verbose: bar.update(len(self._remoteness))
+                if checkpoint_path is not None and frontier and \
+                        time.monotonic() - lastCheckpoint >= checkpoint_interval:
+                    self._saveCheckpoint(checkpoint_path, level, frontier, verbose)
+                    lastCheckpoint = time.monotonic()
+            if checkpoint_path is not None and os.path.exists(checkpoint_path):
+                os.remove(checkpoint_path)
+        else:
+            # BFS for remoteness classification
+            while not self._queue.empty():
+                if verbose: bar.update(len(self._remoteness))
+                puzzle = self._queue.get()
+                remoteness = self._remoteness[hash(puzzle)] + 1
+                for move in puzzle.generateMoves('undo'):
+                    nextPuzzle = puzzle.doMoveUnchecked(move)
+                    nextHash = hash(nextPuzzle)
+                    if nextHash not in self._remoteness:
+                        assert nextPuzzle.primitive() != PuzzleValue.SOLVABLE, """
+                            Found a state where primitive was SOLVABLE while traversing Puzzle tree
+                        """
+                        self._remoteness[nextHash] = remoteness
+                        self._queue.put(nextPuzzle)
         if verbose: bar.finish()
 
+    def solveAll(self, puzzles, verbose=False):
+        """Solves the puzzle from every position of puzzles in turn, into the
+        same remoteness table. Meant for CSPs with many starting positions
+        (e.g. the boards of a Rush Hour difficulty), where solving from one
+        of them only classifies the positions reachable from it.
+
+        Positions that are already in the remoteness table are skipped, as
+        the positions reachable from them have been solved already.
+
+        Parameters
+        ----------
+        puzzles : Iterable of Puzzle
+            The starting positions, of the variant of self.puzzle
+        verbose : bool, optional
+            Prints the number of positions solved and skipped, and the
+            number of positions handled per second, by default False
+        """
+        puzzle = self.puzzle
+        start = time.perf_counter()
+        solved = skipped = 0
+        try:
+            for self.puzzle in puzzles:
+                if hash(self.puzzle) in self._remoteness:
+                    skipped += 1
+                else:
+                    # Not self.solve, so that subclasses that wrap solve
+                    # (to save a database or close a pool) wrap solveAll
+                    # as a whole instead
+                    GeneralSolver.solve(self)
+                    solved += 1
+                if verbose and (solved + skipped) % 100 == 0:
+                    self._printSolveAll(solved, skipped, start)
+        finally:
+            self.puzzle = puzzle
+        if verbose: self._printSolveAll(solved, skipped, start)
+
+    def _printSolveAll(self, solved, skipped, start):
+        elapsed = time.perf_counter() - start
+        print('{} (Variant {}): {} positions solved, {} skipped, {:.1f} positions/s'.format(
+            self.puzzle.id, self.puzzle.variant, solved, skipped,
+            (solved + skipped) / elapsed if elapsed else 0))
+
+    def _newTable(self):
+        """Returns an empty remoteness table for the hash space of the
+        puzzle: a DenseTable if numPositions is known and small enough,
+        else a dict"""
+        return remotenessTable(self.puzzle.numPositions)
+
     @property
     def solved(self):
         """A condition that checks if the Solver is solved. This is True
@@ -122,6 +231,112 @@ class GeneralSolver(Solver):
         """
         return self._remoteness and self._queue.empty()
 
+    def _saveCheckpoint(self, path, level, frontier, verbose=False):
+        """Atomically saves the remoteness table and the frontier of the
+        next level to path, so that a crash never leaves a partial file."""
+        start = time.perf_counter()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        checkpoint = {
+            'id': self.puzzle.id,
+            'variant': self.puzzle.variant,
+            'level': level,
+            'remoteness': self._remoteness,
+            'frontier': frontier
+        }
+        with open(path + '.tmp', 'wb') as fo:
+            pickle.dump(checkpoint, fo, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+        if verbose:
+            print(' Checkpointed level {} ({} positions) in {:.2f}s'.format(
+                level, len(self._remoteness), time.perf_counter() - start))
+
+    def _loadCheckpoint(self, path):
+        """Restores the remoteness table saved by _saveCheckpoint.
+
+        Returns
+        -------
+        (int, array) or None
+            The last completed level and the frontier of the next one,
+            None if there is no checkpoint at path
+        """
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as fo:
+            checkpoint = pickle.load(fo)
+        if (checkpoint['id'], checkpoint['variant']) != (self.puzzle.id, self.puzzle.variant):
+            raise ValueError("{} is a checkpoint of {} (Variant {})".format(
+                path, checkpoint['id'], checkpoint['variant']))
+        self._remoteness = checkpoint['remoteness']
+        return checkpoint['level'], checkpoint['frontier']
+
+    def _hashFrontier(self):
+        """Returns the positions waiting in the queue as an array of hashes
+        if the puzzle can rebuild them through `fromHash`, else None.
+
+        Every queued position is round-tripped through `fromHash` first, so
+        puzzles with an irreversible hash keep using the queue-based BFS.
+        """
+        frontier = array('q')
+        for puzzle in self._queue.queue:
+            if not self._roundTrips(puzzle):
+                return None
+            h = hash(puzzle)
+            if self._remoteness.get(h) != 0:
+                return None
+            frontier.append(h)
+        return frontier
+
+    def _roundTrips(self, puzzle):
+        """Checks that `fromHash` rebuilds a position with the same hash as
+        puzzle, i.e. that the BFS may carry puzzle around as its hash."""
+        from puzzlesolver.puzzles import ServerPuzzle
+
+        fromHash = getattr(type(self.puzzle), 'fromHash', None)
+        if fromHash is None or fromHash.__func__ is ServerPuzzle.fromHash.__func__:
+            return False
+        try:
+            return hash(fromHash(self.puzzle.variant, hash(puzzle))) == hash(puzzle)
+        except Exception:
+            return False
+
+    def _expandLevel(self, frontier, remoteness):
+        """Expands every hash in frontier by its undo moves, classifying
+        unseen children with remoteness. Puzzle objects only live for the
+        duration of their own expansion.
+
+        Returns
+        -------
+        array
+            The hashes of the next level of the BFS
+        """
+        cls, variant = type(self.puzzle), self.puzzle.variant
+        children = array('q')
+        for h in frontier:
+            puzzle = cls.fromHash(variant, h)
+            # Every position is checked once, when its own level is expanded
+            assert remoteness == 1 or puzzle.primitive() != PuzzleValue.SOLVABLE, """
+                Found a state where primitive was SOLVABLE while traversing Puzzle tree
+            """
+            for move in puzzle.generateMoves('undo'):
+                children.append(hash(puzzle.doMoveUnchecked(move)))
+        return self._addLevel(children, remoteness)
+
+    def _addLevel(self, children, remoteness):
+        """Classifies the hashes of children that aren't in the remoteness
+        table yet with remoteness. Returns them as an array, the next
+        frontier of the BFS."""
+        table = self._remoteness
+        if isinstance(table, DenseTable):
+            return table.setdefaults(children, remoteness)
+        nextFrontier = array('q')
+        for h in children:
+            if h not in table:
+                table[h] = remoteness
+                nextFrontier.append(h)
+        return nextFrontier
+
     def _cspGenerateSolutions(self, queue, verbose=False):
         """
         Traverse the puzzle tree, starting from the position returned from __init__,
@@ -132,12 +347,12 @@ class GeneralSolver(Solver):
             print("Finding primitive positions: {}_{}".format(self.puzzle.id, self.puzzle.variant))
             bar = progressbar.ProgressBar(max_value=self.puzzle.numPositions)
             
-        queue_2, found = q.Queue(), set()
+        queue_2, found = q.Queue(), HashSet(self.puzzle.numPositions)
         queue_2.put(self.puzzle)
         found.add(hash(self.puzzle))
         
-        # BFS search for primitive positions
-        # TODO (maybe not?): Make this only require one search
+        # BFS search for primitive positions. See _cspSolve for a version
+        # that only requires one search.
         i = 1
         while not queue_2.empty():
             if verbose: bar.update(i)
@@ -146,9 +361,78 @@ class GeneralSolver(Solver):
                 self._remoteness[hash(puzzle)] = 0
                 queue.put(puzzle)
             for move in puzzle.generateMoves('legal'):
-                nextPuzzle = puzzle.doMove(move)
+                nextPuzzle = puzzle.doMoveUnchecked(move)
                 if hash(nextPuzzle) not in found:
                     found.add(hash(nextPuzzle))
                     queue_2.put(nextPuzzle)
             i += 1
         if verbose: bar.finish()
+
+    def _cspSolve(self, verbose=False):
+        """
+        Solves a CSP with a single traversal of the puzzle tree. The forward
+        BFS from the position returned from __init__ records every legal move
+        as an edge between hashes, then remotenesses are propagated backwards
+        from the primitive positions over the recorded edges, without
+        generating any move again.
+
+        Unlike _cspGenerateSolutions followed by the BFS over undo moves,
+        positions that are not reachable from the starting position are
+        left unclassified.
+        """
+        # Progressbar
+        if verbose:
+            print("Solving {} (Variant {}) in a single pass...".format(self.puzzle.id, self.puzzle.variant))
+            bar = progressbar.ProgressBar(max_value=self.puzzle.numPositions)
+
+        found = HashSet(self.puzzle.numPositions)
+        nodes, primitives = array('q'), array('q')
+        sources, targets = array('q'), array('q')
+        h = hash(self.puzzle)
+        found.add(h)
+        nodes.append(h)
+        level = [(self.puzzle, h)]
+        while level:
+            nextLevel = []
+            for puzzle, h in level:
+                if puzzle.primitive() == PuzzleValue.SOLVABLE:
+                    primitives.append(h)
+                for move in puzzle.generateMoves('legal'):
+                    nextPuzzle = puzzle.doMoveUnchecked(move)
+                    nextHash = hash(nextPuzzle)
+                    sources.append(h)
+                    targets.append(nextHash)
+                    if nextHash not in found:
+                        found.add(nextHash)
+                        nodes.append(nextHash)
+                        nextLevel.append((nextPuzzle, nextHash))
+            level = nextLevel
+            if verbose: bar.update(len(nodes))
+
+        # Index the positions 0..n-1 and store the reverse adjacency as CSR:
+        # the parents of position i are parents[indptr[i]:indptr[i + 1]]
+        order = np.sort(np.frombuffer(nodes, dtype=np.int64))
+        sources = np.searchsorted(order, np.frombuffer(sources, dtype=np.int64))
+        targets = np.searchsorted(order, np.frombuffer(targets, dtype=np.int64))
+        parents = sources[np.argsort(targets, kind='stable')]
+        indptr = np.zeros(len(order) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=len(order)), out=indptr[1:])
+
+        # BFS for remoteness classification, one level at a time
+        remoteness = np.full(len(order), -1, dtype=np.int64)
+        frontier = np.unique(np.searchsorted(order, np.frombuffer(primitives, dtype=np.int64)))
+        remoteness[frontier] = 0
+        depth = 0
+        while len(frontier):
+            depth += 1
+            starts = indptr[frontier]
+            counts = indptr[frontier + 1] - starts
+            # Indices into parents of every parent edge of the frontier
+            edges = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            candidates = np.unique(parents[edges])
+            frontier = candidates[remoteness[candidates] < 0]
+            remoteness[frontier] = depth
+
+        solved = remoteness >= 0
+        self._remoteness.update(zip(order[solved].tolist(), remoteness[solved].tolist()))
+        if verbose: bar.finish()
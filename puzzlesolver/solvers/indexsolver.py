@@ -1,53 +1,62 @@
 # from collections.abc import MutableMapping
 from .generalsolver import GeneralSolver
+from .database import IndexDatabase
 import os
-import gzip
-import random
-from ..util import PuzzleValue
 class IndexSolver(GeneralSolver):
     """
-    A persistence solver that places remoteness values into two-byte chunks, then
+    A persistence solver that places remoteness values into fixed-width chunks, then
     saves them sequentially in a data file. The hash of the puzzle is used to determine
     the index of the chunk. Recommended for puzzles with tight hash functions.
+
+    The data file is an IndexDatabase, which is memory-mapped on the first lookup.
     """
     def __init__(self, puzzle, *args, dir_path='databases', **kwargs):
         GeneralSolver.__init__(self, puzzle, *args, **kwargs)
         if not os.path.exists(dir_path): os.makedirs(dir_path)
-        self.path = '{}/{}{}.bin.gz'.format(dir_path, puzzle.id, puzzle.variant)
-        self.ba = bytearray()
-        self.solvableHashes = []
-    
+        self.path = '{}/{}{}.bin'.format(dir_path, puzzle.id, puzzle.variant)
+        if not os.path.exists(self.path) and os.path.exists(self.path + '.gz') \
+                and puzzle.hash_version == 0:
+            # Database written by an older IndexSolver, before any change of the hash
+            self.path += '.gz'
+        self.db = None
+
     def getRandomSolvableHash(self):
-        if not self.solvableHashes:
+        if self.db is None:
             self._read()
-        return random.choice(self.solvableHashes)
+        return self.db.random_solvable()
 
     def getRemoteness(self, puzzle, *args, **kwargs):
-        if not self.ba:
+        if self.db is None:
             self._read()
-        return self.ba[hash(puzzle)]
+        return self.db[hash(puzzle)]
+
+    def getRemotenesses(self, puzzles, *args, **kwargs):
+        if self.db is None:
+            self._read()
+        db = self.db
+        return [db[hash(puzzle)] for puzzle in puzzles]
 
     def solve(self, *args, overwrite=False, **kwargs):
         if overwrite or not os.path.exists(self.path):
-            self._read()
             GeneralSolver.solve(self, *args, **kwargs)
             self._write()
         else:
             print(f'Database file {self.path} found! No need to re-solve.')
 
     def _read(self):
-        if not os.path.exists(self.path): open(self.path, 'wb').close()
-        with gzip.open(self.path, 'rb') as fo:
-            self.ba = fo.read()
-            self.solvableHashes = [i for i in range(len(self.ba)) \
-                if self.ba[i] < PuzzleValue.MAX_REMOTENESS and self.ba[i] >= 0]
+        if self.db is None:
+            db = IndexDatabase(self.path)
+            if db.hash_version != self.puzzle.hash_version:
+                db.close()
+                raise ValueError("{} was solved with hash version {} of {}, not {}".format(
+                    self.path, db.hash_version, self.puzzle.id, self.puzzle.hash_version))
+            self.db = db
 
     def _write(self):
-        ba = bytearray(max(self._remoteness) + 1)
-        for i in range(len(ba)):
-            ba[i] = PuzzleValue.MAX_REMOTENESS
-        for i in self._remoteness:
-            chunk = self._remoteness[i].to_bytes(1, byteorder='little')
-            ba[i] = chunk[0]
-        with gzip.open(self.path, 'wb') as fo:
-            fo.write(ba)
+        if self.path.endswith('.gz'):
+            self.path = self.path[:-len('.gz')]
+        IndexDatabase.write(self.path, self.puzzle.id, self.puzzle.variant, self._remoteness,
+            self.puzzle.hash_version)
+        if self.db is not None:
+            self.db.close()
+            self.db = None
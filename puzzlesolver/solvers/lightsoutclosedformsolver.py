@@ -1,59 +1,146 @@
 import random
+import numpy as np
 from .solver import Solver
 from ..util import *
 
+class BitmaskGF2Matrix:
+    """
+    Pure Python / NumPy implementation of m4ri_utils.GF2Matrix, used when
+    the extension isn't built. Every row is an int bitmask whose most
+    significant bit is its first entry, so that the entries of a product
+    with a board are the parities of `row & board`.
+    """
+    # Below this many board bits per call, plain Python beats NumPy
+    NUMPY_MIN_BITS = 128
+
+    def __init__(self, A=None, rows=None):
+        if A is not None:
+            rows = [int(''.join(str(int(val)) for val in row), 2) for row in A]
+            self.cols = len(A[0])
+        else:
+            self.cols = len(rows)
+        self.rows = len(rows)
+        self._rows = rows
+        self._columns = None
+
+    def inverse(self):
+        """Returns the inverse of this (square) matrix, by Gauss-Jordan
+        elimination on [A | I]."""
+        n = self.cols
+        rows = [(row << n) | (1 << (n - 1 - i)) for i, row in enumerate(self._rows)]
+        for col in range(n):
+            bit = 1 << (2 * n - 1 - col)
+            pivot = next((i for i in range(col, n) if rows[i] & bit), None)
+            if pivot is None:
+                raise ValueError("Matrix is singular")
+            rows[col], rows[pivot] = rows[pivot], rows[col]
+            for i in range(n):
+                if i != col and rows[i] & bit:
+                    rows[i] ^= rows[col]
+        mask = (1 << n) - 1
+        return BitmaskGF2Matrix(rows=[row & mask for row in rows])
+
+    def _product(self, board):
+        if self._columns is None:
+            # The column multiplied by bit i of a board (i.e. column cols - 1 - i)
+            self._columns = [sum(((row >> i) & 1) << (self.rows - 1 - r) for r, row in enumerate(self._rows))
+                for i in range(self.cols)]
+        product = 0
+        while board:
+            bit = board & -board
+            product ^= self._columns[bit.bit_length() - 1]
+            board ^= bit
+        return product
+
+    def tolist(self):
+        return [[(row >> (self.cols - 1 - j)) & 1 for j in range(self.cols)] for row in self._rows]
+
+    def popcounts(self, boards):
+        """Same as m4ri_utils.GF2Matrix.popcounts: every (row, board) pair
+        is and-ed at once in a (rows, boards) array, whose entries are then
+        folded down to their parity."""
+        if self.cols > 64:
+            raise ValueError("Boards are limited to 64 entries")
+        boards = list(boards)
+        if len(boards) * self.cols < BitmaskGF2Matrix.NUMPY_MIN_BITS:
+            # Not worth the overhead of NumPy: the product is the xor of the
+            # columns picked by the bits of the board
+            return [bin(self._product(board)).count('1') for board in boards]
+        boards = np.array(boards, dtype=np.uint64)
+        bits = np.array(self._rows, dtype=np.uint64)[:, None] & boards[None, :]
+        for shift in (32, 16, 8, 4, 2, 1):
+            bits ^= bits >> np.uint64(shift)
+        return (bits & np.uint64(1)).sum(axis=0).tolist()
+
 try:
     from ..extern import m4ri_utils
-except:
-    class LightsOutClosedFormSolver(Solver):
-        pass
+except ImportError:
+    GF2Matrix = BitmaskGF2Matrix
 else:
-    class LightsOutClosedFormSolver(Solver):
-        def __init__(self, puzzle, **kwargs):
-            self.puzzle = puzzle
-            self.path = "closed_form"
-            self.op = [self.__construct_matrix(i, i) for i in range(9)]
-            full_rank_variants = {2, 3, 6, 7, 8}
-            for variant in full_rank_variants:
-                self.op[variant] = m4ri_utils.mat_inv_GF2(self.op[variant])
-
-        def getRandomSolvableHash(self):
-            # All hashes are solvable if this closed-form solver can be used.
-            return random.getrandbits(self.puzzle.size**2)
-
-        def getRemoteness(self, puzzle, *args, **kwargs):
-            m = int(puzzle.variant)
-            op = self.op[m]
-            # We cannot use python built-in hash() function here because
-            # it truncates some hashes for variants >= 8.
-            target = [[int(val)] for row in puzzle.grid for val in row]
-            res = m4ri_utils.mat_mul_GF2(op, target)
-            count = 0
-            for i in range(m * m):
-                count += res[i][0]
-            return count
-
-        def solve(self):
-            return
-
-        @staticmethod
-        def __construct_matrix(m: int, n: int):
-            d = m * n
-            mat = [[0 for _ in range(d)] for _ in range(d)]
-            for k in range(d):
-                i = k // n
-                j = k % n
-                mat[k][k] = 1
-                # toggle left cell if possible
-                if j > 0:
-                    mat[k - 1][k] = 1
-                # toggle right cell if possible
-                if j < n - 1:
-                    mat[k + 1][k] = 1
-                # toggle cell above if possible
-                if i > 0:
-                    mat[k - n][k] = 1
-                # toggle cell below if possible
-                if i < m - 1:
-                    mat[k + n][k] = 1
-            return mat
+    GF2Matrix = m4ri_utils.GF2Matrix
+
+class LightsOutClosedFormSolver(Solver):
+    # No database file, so every variant it is used for is always solved
+    path = "closed_form"
+
+    def __init__(self, puzzle, **kwargs):
+        self.puzzle = puzzle
+        # Inverses of the toggle matrices of the full rank variants, kept
+        # in the form of GF2Matrix (m4ri if it is built) so that lookups
+        # don't convert them again
+        full_rank_variants = {2, 3, 6, 7, 8}
+        self.op = {variant: GF2Matrix(self.__construct_matrix(variant, variant)).inverse()
+            for variant in full_rank_variants}
+
+    def getRandomSolvableHash(self):
+        # All hashes are solvable if this closed-form solver can be used.
+        return random.getrandbits(self.puzzle.size**2)
+
+    def getRemoteness(self, puzzle, *args, **kwargs):
+        return self.getRemotenesses([puzzle])[0]
+
+    def getRemotenesses(self, puzzles, *args, **kwargs):
+        """Computes the remotenesses of every puzzle of the same variant
+        with a single multiplication, the boards being the columns of
+        the right-hand side matrix."""
+        puzzles = list(puzzles)
+        remotenesses = [None] * len(puzzles)
+        variants = {}
+        for i, puzzle in enumerate(puzzles):
+            variants.setdefault(int(puzzle.variant), []).append(i)
+        for m, indices in variants.items():
+            counts = self.op[m].popcounts(self.__board(puzzles[i]) for i in indices)
+            for i, count in zip(indices, counts):
+                remotenesses[i] = count
+        return remotenesses
+
+    @staticmethod
+    def __board(puzzle):
+        # We cannot use python built-in hash() function here because
+        # it truncates some hashes for variants >= 8.
+        return puzzle.board
+
+    def solve(self):
+        return
+
+    @staticmethod
+    def __construct_matrix(m: int, n: int):
+        d = m * n
+        mat = [[0 for _ in range(d)] for _ in range(d)]
+        for k in range(d):
+            i = k // n
+            j = k % n
+            mat[k][k] = 1
+            # toggle left cell if possible
+            if j > 0:
+                mat[k - 1][k] = 1
+            # toggle right cell if possible
+            if j < n - 1:
+                mat[k + 1][k] = 1
+            # toggle cell above if possible
+            if i > 0:
+                mat[k - n][k] = 1
+            # toggle cell below if possible
+            if i < m - 1:
+                mat[k + n][k] = 1
+        return mat
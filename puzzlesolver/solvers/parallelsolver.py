@@ -0,0 +1,119 @@
+from .generalsolver import GeneralSolver
+from .tables import HashSet
+from ..util import PuzzleValue
+from array import array
+import multiprocessing as mp
+import progressbar
+import os
+
+def _expand(task):
+    """Worker side of the ParallelSolver. Rebuilds every hash of a frontier
+    chunk with `fromHash` and generates its children with movetype.
+
+    Returns the hashes of the SOLVABLE positions of the chunk, and the
+    (chunk-wise deduplicated) hashes of their children in discovery order.
+    """
+    cls, variant, movetype, hashes = task
+    primitives, children, seen = array('q'), array('q'), set()
+    for h in hashes:
+        puzzle = cls.fromHash(variant, h)
+        if movetype == 'legal' and puzzle.primitive() == PuzzleValue.SOLVABLE:
+            primitives.append(h)
+        for move in puzzle.generateMoves(movetype):
+            nextHash = hash(puzzle.doMoveUnchecked(move))
+            if nextHash not in seen:
+                seen.add(nextHash)
+                children.append(nextHash)
+    return primitives, children
+
+class ParallelSolver(GeneralSolver):
+    """
+    A GeneralSolver that splits every level of the BFS into chunks and expands
+    them on a pool of worker processes. Children are merged back into the
+    remoteness table in chunk order, so the first visit of a position decides
+    its remoteness exactly like the serial solver. The `primitive()` sanity
+    assertions of the GeneralSolver are only made on levels small enough to
+    be expanded in-process.
+
+    Only puzzles whose positions round-trip through `fromHash` are expanded in
+    parallel; anything else falls back to the serial GeneralSolver. Can be
+    mixed in front of the persistence solvers, i.e.
+    `class ParallelIndexSolver(ParallelSolver, IndexSolver)`.
+    """
+    def __init__(self, puzzle, *args, processes=None, chunksize=4096, **kwargs):
+        super().__init__(puzzle, *args, **kwargs)
+        self.processes = processes or os.cpu_count()
+        self.chunksize = chunksize
+        self._pool = None
+
+    def solve(self, *args, **kwargs):
+        try:
+            return super().solve(*args, **kwargs)
+        finally:
+            self._closePool()
+
+    def solveAll(self, *args, **kwargs):
+        # The pool is shared by the solves from every position
+        try:
+            return super().solveAll(*args, **kwargs)
+        finally:
+            self._closePool()
+
+    def _getPool(self):
+        if self._pool is None:
+            self._pool = mp.Pool(self.processes)
+        return self._pool
+
+    def _closePool(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def _map(self, frontier, movetype):
+        """Splits frontier into chunks and expands them on the pool. Yields
+        the results of every chunk in the order of frontier."""
+        cls, variant = type(self.puzzle), self.puzzle.variant
+        chunksize = max(1, min(self.chunksize, len(frontier) // self.processes))
+        tasks = ((cls, variant, movetype, frontier[i:i + chunksize])
+            for i in range(0, len(frontier), chunksize))
+        return self._getPool().imap(_expand, tasks)
+
+    def _expandLevel(self, frontier, remoteness):
+        if len(frontier) < 2 * self.processes:
+            return GeneralSolver._expandLevel(self, frontier, remoteness)
+        nextFrontier = array('q')
+        for _, children in self._map(frontier, 'undo'):
+            nextFrontier.extend(self._addLevel(children, remoteness))
+        return nextFrontier
+
+    def _cspGenerateSolutions(self, queue, verbose=False):
+        """
+        Same as GeneralSolver._cspGenerateSolutions, except that the forward
+        traversal is done level by level on the pool.
+        """
+        if not self._roundTrips(self.puzzle):
+            return GeneralSolver._cspGenerateSolutions(self, queue, verbose)
+
+        # Progressbar
+        if verbose:
+            print("Finding primitive positions: {}_{}".format(self.puzzle.id, self.puzzle.variant))
+            bar = progressbar.ProgressBar(max_value=self.puzzle.numPositions)
+
+        cls, variant = type(self.puzzle), self.puzzle.variant
+        frontier = array('q', [hash(self.puzzle)])
+        found = HashSet(self.puzzle.numPositions)
+        found.add(frontier[0])
+        while frontier:
+            nextFrontier = array('q')
+            for primitives, children in self._map(frontier, 'legal'):
+                for h in primitives:
+                    self._remoteness[h] = 0
+                    queue.put(cls.fromHash(variant, h))
+                for nextHash in children:
+                    if nextHash not in found:
+                        found.add(nextHash)
+                        nextFrontier.append(nextHash)
+            frontier = nextFrontier
+            if verbose: bar.update(len(found))
+        if verbose: bar.finish()
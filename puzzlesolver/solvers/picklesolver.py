@@ -1,54 +1,105 @@
 from .generalsolver import GeneralSolver
+from .database import SortedDatabase
 import os
 import pickle
 import random
+from itertools import islice
 from ..util import *
 
 
 class PickleSolver(GeneralSolver):
     """
-    A persistence solver that places remoteness values into two-byte chunks, then
-    saves them sequentially in a data file. The hash of the puzzle is used to determine
-    the index of the chunk. Recommended for puzzles with tight hash functions.
+    A persistence solver that only stores the positions that can reach a
+    solution, for puzzles whose hashes are too sparse for an IndexSolver.
+
+    The data file is a SortedDatabase (sorted hashes and their packed
+    remotenesses), which is memory-mapped on the first lookup. Databases
+    pickled by older PickleSolvers (`.pickle`) can still be read, but they
+    are loaded into a dict.
     """
 
     def __init__(self, puzzle, *args, dir_path="databases", **kwargs):
         GeneralSolver.__init__(self, puzzle, *args, **kwargs)
         if not os.path.exists(dir_path):
             os.makedirs(dir_path)
-        self.path = "{}/{}{}.pickle".format(dir_path, puzzle.id, puzzle.variant)
-        self.solvableHashes = []
+        self.path = "{}/{}{}.sorted".format(dir_path, puzzle.id, puzzle.variant)
+        legacy_path = "{}/{}{}.pickle".format(dir_path, puzzle.id, puzzle.variant)
+        if not os.path.exists(self.path) and os.path.exists(legacy_path) \
+                and puzzle.hash_version == 0:
+            # Database written by an older PickleSolver, before any change of the hash
+            self.path = legacy_path
+        self.db = None
 
     def getRandomSolvableHash(self):
         if not self._remoteness:
             self._read()
-        return random.choice(self.solvableHashes)
+        if self.db is not None:
+            return self.db.random_solvable()
+        # A legacy pickle, loaded into a dict: skips to a random key rather
+        # than copying them, which takes time linear in the table size
+        k = random.randrange(len(self._remoteness))
+        return next(islice(self._remoteness, k, None))
 
     def getRemoteness(self, puzzle, *args, **kwargs):
         if not self._remoteness:
             self._read()
+        if self.db is not None:
+            return self.db[hash(puzzle)]
         return GeneralSolver.getRemoteness(self, puzzle, *args, **kwargs)
 
+    def getRemotenesses(self, puzzles, *args, **kwargs):
+        if not self._remoteness:
+            self._read()
+        if self.db is not None:
+            db = self.db
+            return [db[hash(puzzle)] for puzzle in puzzles]
+        return GeneralSolver.getRemotenesses(self, puzzles, *args, **kwargs)
+
     def solve(self, *args, overwrite=False, **kwargs):
         if overwrite or not os.path.exists(self.path):
             GeneralSolver.solve(self, *args, **kwargs)
-            self._generateSolvableHashes()
             self._write()
         else:
             print(f'Database file {self.path} found! No need to re-solve.')
             #self._read()
 
+    def solveAll(self, puzzles, *args, overwrite=False, **kwargs):
+        # Adds to the database file, if there is one, skipping the positions
+        # it already has
+        if not overwrite:
+            self._load()
+        GeneralSolver.solveAll(self, puzzles, *args, **kwargs)
+        self._write()
+
     def _read(self):
-        if not self._remoteness and os.path.exists(self.path):
+        if self.db is not None or self._remoteness or not os.path.exists(self.path):
+            return
+        if self.path.endswith('.pickle'):
             with open(self.path, "r+b") as fo:
                 self._remoteness = pickle.load(fo)
-            self._generateSolvableHashes()
+        else:
+            db = SortedDatabase(self.path)
+            if db.hash_version != self.puzzle.hash_version:
+                db.close()
+                raise ValueError("{} was solved with hash version {} of {}, not {}".format(
+                    self.path, db.hash_version, self.puzzle.id, self.puzzle.hash_version))
+            self.db = db
 
-    def _write(self):
-        with open(self.path, "w+b") as fo:
-            pickle.dump(self._remoteness, fo)
+    def _load(self):
+        """Loads the database into the remoteness table, to be solved further"""
+        self._read()
+        if self.db is not None:
+            hashes, values = self.db.arrays()
+            self._remoteness = dict(zip(hashes.tolist(), values.tolist()))
+            self.db.close()
+            self.db = None
 
-    def _generateSolvableHashes(self):
-        assert(self._remoteness)
-        self.solvableHashes = [key for key in self._remoteness.keys()
-            if self._remoteness[key] >= 0 and self._remoteness[key] < PuzzleValue.MAX_REMOTENESS]
+    def _write(self):
+        if self.path.endswith('.pickle'):
+            self.path = self.path[:-len('.pickle')] + '.sorted'
+        SortedDatabase.write(self.path, self.puzzle.id, self.puzzle.variant, self._remoteness,
+            self.puzzle.hash_version)
+        if self.db is not None:
+            self.db.close()
+        # Lookups and random picks are served from the file from now on
+        self.db = SortedDatabase(self.path)
@@ -39,4 +39,32 @@ class Solver:
         """
         remoteness = self.getRemoteness(puzzle, **kwargs)
         if remoteness == PuzzleValue.MAX_REMOTENESS: return PuzzleValue.UNSOLVABLE
-        return PuzzleValue.SOLVABLE
\ No newline at end of file
+        return PuzzleValue.SOLVABLE
+
+    def getRemotenesses(self, puzzles, **kwargs):
+        """Finds the remoteness of every puzzle in puzzles. Solvers that can
+        look up many positions at once more cheaply than one at a time
+        (e.g. by opening their database once) should override this.
+
+        Inputs:
+        puzzles -- an iterable of puzzles
+
+        Outputs:
+        list of the remotenesses of puzzles, in order
+        """
+        return [self.getRemoteness(puzzle, **kwargs) for puzzle in puzzles]
+
+    def getValuesAndRemotenesses(self, puzzles, **kwargs):
+        """Returns the solved value and remoteness of every puzzle in puzzles,
+        evaluating each puzzle only once
+
+        Inputs:
+        puzzles -- an iterable of puzzles
+
+        Outputs:
+        list of (value, remoteness) tuples, in order
+        """
+        return [
+            (PuzzleValue.UNSOLVABLE if remoteness == PuzzleValue.MAX_REMOTENESS else PuzzleValue.SOLVABLE, remoteness)
+            for remoteness in self.getRemotenesses(puzzles, **kwargs)
+        ]
\ No newline at end of file
@@ -0,0 +1,158 @@
+from array import array
+from collections.abc import MutableMapping
+import numpy as np
+
+# Largest hash space that gets a dense table (one byte per position for
+# remotenesses, one bit per position for sets). Anything larger, or a puzzle
+# without numPositions, uses a regular dict / set.
+MAX_DENSE_SIZE = 1 << 28
+
+def isDense(size):
+    return size is not None and 0 < size <= MAX_DENSE_SIZE
+
+def remotenessTable(size=None):
+    """Returns an empty hash -> remoteness table for a hash space of `size`
+    hashes: a DenseTable if size is known and small enough, else a dict."""
+    return DenseTable(size) if isDense(size) else {}
+
+class HashSet:
+    """
+    Set of position hashes backed by a bitmap of `size` bits, i.e. one bit
+    per position instead of a boxed int and a hash table slot. Hashes outside
+    of [0, size) (or every hash, if size is None) go to a regular set.
+    """
+    def __init__(self, size=None):
+        self.size = size if isDense(size) else 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self._overflow = set()
+        self._count = 0
+
+    def add(self, h):
+        if 0 <= h < self.size:
+            mask = 1 << (h & 7)
+            if not self._bits[h >> 3] & mask:
+                self._bits[h >> 3] |= mask
+                self._count += 1
+        else:
+            self._overflow.add(h)
+
+    def __contains__(self, h):
+        if 0 <= h < self.size:
+            return bool(self._bits[h >> 3] & (1 << (h & 7)))
+        return h in self._overflow
+
+    def __len__(self):
+        return self._count + len(self._overflow)
+
+class DenseTable(MutableMapping):
+    """
+    Dict-like hash -> remoteness table backed by an array indexed by hash,
+    for puzzles whose hashes are bounded by numPositions. Entries are a single
+    byte until a remoteness doesn't fit anymore, then widen to 2 and 4 bytes.
+    The all-ones entry marks a hash that isn't in the table. Hashes outside of
+    [0, size) go to a regular dict.
+    """
+    WIDENINGS = {'B': 'H', 'H': 'I'}
+
+    def __init__(self, size):
+        self.size = size
+        self._values = array('B', bytes([0xFF])) * size
+        self._missing = 0xFF
+        self._overflow = {}
+        self._count = 0
+
+    def _widen(self, value):
+        while value >= self._missing:
+            typecode = DenseTable.WIDENINGS.get(self._values.typecode)
+            if typecode is None:
+                raise ValueError("Remoteness {} does not fit in a DenseTable".format(value))
+            values = np.frombuffer(self._values, dtype=np.dtype(self._values.typecode))
+            missing = (1 << (8 * array(typecode).itemsize)) - 1
+            widened = values.astype(np.dtype(typecode))
+            widened[values == self._missing] = missing
+            self._values = array(typecode, widened.tobytes())
+            self._missing = missing
+
+    def __getitem__(self, h):
+        if 0 <= h < self.size:
+            value = self._values[h]
+            if value == self._missing:
+                raise KeyError(h)
+            return value
+        return self._overflow[h]
+
+    def get(self, h, default=None):
+        if 0 <= h < self.size:
+            value = self._values[h]
+            return default if value == self._missing else value
+        return self._overflow.get(h, default)
+
+    def __contains__(self, h):
+        if 0 <= h < self.size:
+            return self._values[h] != self._missing
+        return h in self._overflow
+
+    def __setitem__(self, h, value):
+        if 0 <= h < self.size:
+            if value >= self._missing:
+                self._widen(value)
+            if self._values[h] == self._missing:
+                self._count += 1
+            self._values[h] = value
+        else:
+            self._overflow[h] = value
+
+    def __delitem__(self, h):
+        if 0 <= h < self.size:
+            if self._values[h] == self._missing:
+                raise KeyError(h)
+            self._values[h] = self._missing
+            self._count -= 1
+        else:
+            del self._overflow[h]
+
+    def __iter__(self):
+        yield from self.arrays()[0].tolist()
+
+    def __len__(self):
+        return self._count + len(self._overflow)
+
+    def setdefaults(self, hashes, value):
+        """Sets every hash of the int64 array-like hashes that isn't in the
+        table yet to value, with a few numpy operations instead of a method
+        call per hash. Returns the added hashes as an array('q'), the ones in
+        range in increasing order, without duplicates."""
+        hashes = np.frombuffer(hashes, dtype=np.int64) if not isinstance(hashes, np.ndarray) else hashes
+        if value >= self._missing:
+            self._widen(value)
+        values = np.frombuffer(self._values, dtype=np.dtype(self._values.typecode))
+        inRange = (hashes >= 0) & (hashes < self.size)
+        candidates = np.unique(hashes[inRange])
+        added = candidates[values[candidates] == self._missing]
+        values[added] = value
+        self._count += len(added)
+        added = array('q', added.tobytes())
+        for h in hashes[~inRange].tolist():
+            if h not in self._overflow:
+                self._overflow[h] = value
+                added.append(h)
+        return added
+
+    def arrays(self):
+        """Returns the hashes of the table in increasing order and their
+        remotenesses, as two int64 numpy arrays"""
+        values = np.frombuffer(self._values, dtype=np.dtype(self._values.typecode))
+        hashes = np.flatnonzero(values != self._missing)
+        values = values[hashes].astype(np.int64)
+        if self._overflow:
+            overflow = sorted(self._overflow.items())
+            hashes = np.concatenate((hashes, np.array([h for h, _ in overflow], dtype=np.int64)))
+            values = np.concatenate((values, np.array([v for _, v in overflow], dtype=np.int64)))
+        return hashes, values
+
+    def items(self):
+        hashes, values = self.arrays()
+        return list(zip(hashes.tolist(), values.tolist()))
+
+    def values(self):
+        return self.arrays()[1].tolist()
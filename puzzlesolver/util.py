@@ -4,7 +4,8 @@ class PuzzleValue:
     SOLVABLE = "win"
     UNSOLVABLE = "lose"
     UNDECIDED = "undecided"
-    MAX_REMOTENESS = 127
+    # Remoteness of the positions that cannot reach a solution
+    MAX_REMOTENESS = (1 << 32) - 1
 
     @staticmethod
     def contains(key):
@@ -21,6 +22,73 @@ class PuzzleException(Exception):
     """An Exception meant to be caught by the server"""
     pass
 
+# Permutation ranking, for puzzles hashed by the lexicographic index of a
+# permutation of range(n). The Lehmer code digit of a value is the number of
+# smaller values that come after it, i.e. the value minus the number of
+# smaller values before it, which is a popcount of the values seen so far.
+
+_factorials = [1]
+_POPCOUNTS = bytes(bin(x).count('1') for x in range(1 << 16))
+_BELOW = [(1 << v) - 1 for v in range(16)]
+
+def factorials(n):
+    """Returns a list of at least 0!, 1!, ..., n!, which is cached"""
+    while len(_factorials) <= n:
+        _factorials.append(_factorials[-1] * len(_factorials))
+    return _factorials
+
+def permutationRank(perm):
+    """Returns the lexicographic index of perm among the permutations of
+    range(len(perm))"""
+    n = len(perm)
+    rank, seen = 0, 0
+    if n <= 16:
+        for v in perm:
+            rank = rank * n + v - _POPCOUNTS[seen & _BELOW[v]]
+            n -= 1
+            seen |= 1 << v
+    else:
+        for v in perm:
+            rank = rank * n + v - bin(seen & ((1 << v) - 1)).count('1')
+            n -= 1
+            seen |= 1 << v
+    return rank
+
+def permutationUnrank(n, rank):
+    """Returns the permutation of range(n) of lexicographic index rank"""
+    fact = factorials(n)
+    values = list(range(n))
+    perm = []
+    for i in range(n - 1, -1, -1):
+        digit, rank = divmod(rank, fact[i])
+        perm.append(values.pop(digit))
+    return perm
+
+def permutationSwapRank(rank, perm, i, j):
+    """Returns the rank of perm with the values at indices i and j swapped,
+    given rank, the rank of perm. Only the digits of i and j, and those of
+    the indices between them holding a value between perm[i] and perm[j],
+    change, so this is cheaper than ranking the new permutation."""
+    if i == j:
+        return rank
+    if i > j:
+        i, j = j, i
+    a, b = perm[i], perm[j]
+    lo, hi = (a, b) if a < b else (b, a)
+    n = len(perm)
+    fact = factorials(n)
+    fact_i = fact[n - 1 - i]
+    delta = fact_i
+    for k in range(i + 1, j):
+        if lo < perm[k] < hi:
+            delta += fact_i + fact[n - 1 - k]
+    after = 0
+    for k in range(j + 1, n):
+        if lo < perm[k] < hi:
+            after += 1
+    delta += after * (fact_i - fact[n - 1 - j])
+    return rank + delta if a < b else rank - delta
+
 class ClassPropertyDescriptor(object):
     def __init__(self, fget, fset=None):
         self.fget = fget
@@ -0,0 +1,47 @@
+"""Node throughput of expanding positions (generating their moves and
+applying each of them) with doMove, which checks the move against
+generateMoves in some puzzles, and with doMoveUnchecked, which solvers use.
+
+    python -m scripts.benchmarks.do_move [number of positions]
+"""
+import random
+import sys
+import time
+from puzzlesolver.puzzles import PuzzleManager
+from scripts.benchmarks.primitive import random_positions
+
+def expand(positions, unchecked):
+    start, children = time.perf_counter(), 0
+    for position in positions:
+        doMove = position.doMoveUnchecked if unchecked else position.doMove
+        for move in position.generateMoves('legal'):
+            doMove(move)
+            children += 1
+    return time.perf_counter() - start, children
+
+def throughputs(positions, repeat=5):
+    """Returns the number of children generated per second with doMove and
+    with doMoveUnchecked, taking the best of alternating runs"""
+    best = [float('inf'), float('inf')]
+    for _ in range(repeat):
+        for unchecked in (False, True):
+            elapsed, children = expand(positions, unchecked)
+            best[unchecked] = min(best[unchecked], elapsed)
+    return children / best[False], children / best[True]
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    random.seed(0)
+    for p_cls in PuzzleManager.getPuzzleClasses():
+        variant = p_cls.variants[0]
+        try:
+            positions = random_positions(p_cls.generateStartPosition(variant), count)
+        except Exception as e:
+            print(f"{p_cls.id:20} {variant:10} skipped ({type(e).__name__}: {e})")
+            continue
+        checked, unchecked = throughputs(positions)
+        if not checked:
+            print(f"{p_cls.id:20} {variant:10} skipped (no moves)")
+            continue
+        print(f"{p_cls.id:20} {variant:10} doMove {checked:10.0f}/s  "
+              f"doMoveUnchecked {unchecked:10.0f}/s  ({unchecked / checked:.1f}x)")
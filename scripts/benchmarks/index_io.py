@@ -0,0 +1,56 @@
+"""Times writing an IndexDatabase and listing its solvable hashes, against
+the per-entry Python loops the IndexSolver used before.
+
+    python -m scripts.benchmarks.index_io [number of hashes]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from puzzlesolver.solvers.database import IndexDatabase
+
+UNSOLVABLE = 127
+
+def loop_write(path, remoteness):
+    """The old IndexSolver._write, without the gzip compression"""
+    ba = bytearray(max(remoteness) + 1)
+    for i in range(len(ba)):
+        ba[i] = UNSOLVABLE
+    for i in remoteness:
+        chunk = remoteness[i].to_bytes(1, byteorder='little')
+        ba[i] = chunk[0]
+    with open(path, 'wb') as fo:
+        fo.write(ba)
+
+def loop_solvable(path):
+    """The old IndexSolver._read, without the gzip decompression"""
+    with open(path, 'rb') as fo:
+        ba = fo.read()
+    return [i for i in range(len(ba)) if ba[i] < UNSOLVABLE and ba[i] >= 0]
+
+def timed(f, *args):
+    start = time.perf_counter()
+    result = f(*args)
+    return time.perf_counter() - start, result
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 4000000
+    # Half of the hash space is solvable, with remotenesses of a few bytes
+    random.seed(0)
+    remoteness = {h: random.randrange(100) for h in range(0, size, 2)}
+    remoteness[size - 1] = 0
+
+    with tempfile.TemporaryDirectory() as dir_path:
+        loop_path, index_path = os.path.join(dir_path, 'loop'), os.path.join(dir_path, 'index')
+        loop_write_time, _ = timed(loop_write, loop_path, remoteness)
+        loop_read_time, loop_hashes = timed(loop_solvable, loop_path)
+        write_time, _ = timed(IndexDatabase.write, index_path, 'benchmark', 'benchmark', remoteness)
+        db = IndexDatabase(index_path)
+        read_time, hashes = timed(db.solvable)
+        db.close()
+        assert hashes.tolist() == loop_hashes
+
+    print(f"{size} hashes, {len(remoteness)} solvable")
+    print(f"write:    loop {loop_write_time:.2f}s  numpy {write_time:.2f}s  ({loop_write_time / write_time:.0f}x)")
+    print(f"solvable: loop {loop_read_time:.2f}s  numpy {read_time:.2f}s  ({loop_read_time / read_time:.0f}x)")
@@ -0,0 +1,44 @@
+"""Times LightsOutClosedFormSolver lookups with the m4ri extension (if it
+is built) and with the bitmask implementation used without it.
+
+    python -m scripts.benchmarks.lightsout_closed_form [batch size]
+"""
+import random
+import sys
+import time
+from puzzlesolver.puzzles import LightsOut
+from puzzlesolver.solvers import lightsoutclosedformsolver
+from puzzlesolver.solvers.lightsoutclosedformsolver import BitmaskGF2Matrix, LightsOutClosedFormSolver
+
+def engines():
+    yield 'bitmask', BitmaskGF2Matrix
+    try:
+        from puzzlesolver.extern import m4ri_utils
+    except ImportError:
+        print("m4ri_utils is not built, only timing the bitmask implementation")
+    else:
+        yield 'm4ri', m4ri_utils.GF2Matrix
+
+def random_puzzles(variant, count):
+    return [LightsOut.fromString(variant, format(random.getrandbits(int(variant) ** 2), '0{}b'.format(int(variant) ** 2)))
+        for _ in range(count)]
+
+def per_position(f, puzzles, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f(puzzles)
+        best = min(best, time.perf_counter() - start)
+    return best / len(puzzles) * 1e6
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    random.seed(0)
+    for name, matrix in engines():
+        lightsoutclosedformsolver.GF2Matrix = matrix
+        for variant in LightsOut.closed_form_variants:
+            solver = LightsOutClosedFormSolver(LightsOut.generateStartPosition(variant))
+            puzzles = random_puzzles(variant, size)
+            single = per_position(lambda puzzles: [solver.getRemoteness(p) for p in puzzles], puzzles)
+            batch = per_position(solver.getRemotenesses, puzzles)
+            print(f"{name:8} variant {variant}: {single:6.1f}us per lookup, {batch:6.1f}us per position in batches of {size}")
@@ -0,0 +1,43 @@
+"""Times primitive() on positions of every variant of every puzzle of the
+PuzzleManager. Positions are taken along random walks from the start
+position, since solvers call primitive() on every position they reach.
+
+    python -m scripts.benchmarks.primitive [number of positions]
+"""
+import random
+import sys
+import time
+from puzzlesolver.puzzles import PuzzleManager
+
+def random_positions(puzzle, count, walk=30):
+    positions = []
+    while len(positions) < count:
+        position = puzzle
+        for _ in range(random.randrange(walk)):
+            moves = list(position.generateMoves('legal'))
+            if not moves:
+                break
+            position = position.doMove(random.choice(moves))
+        positions.append(position)
+    return positions
+
+def per_call(positions, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for position in positions:
+            position.primitive()
+        best = min(best, time.perf_counter() - start)
+    return best / len(positions) * 1e6
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    random.seed(0)
+    for p_cls in PuzzleManager.getPuzzleClasses():
+        for variant in p_cls.variants:
+            try:
+                positions = random_positions(p_cls.generateStartPosition(variant), count)
+            except Exception as e:
+                print(f"{p_cls.id:20} {variant:10} skipped ({type(e).__name__}: {e})")
+                continue
+            print(f"{p_cls.id:20} {variant:10} {per_call(positions):8.2f}us")
@@ -1 +1 @@
-from .src import app, test_puzzle
\ No newline at end of file
+from .src import app, test_puzzle, warm_variants
\ No newline at end of file
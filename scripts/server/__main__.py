@@ -1,4 +1,5 @@
-from .src import app
+from .src import app, warm_variants
+from .src.registry import parse_variants
 import os
 
 if __name__ == "__main__":
@@ -7,6 +8,10 @@ if __name__ == "__main__":
         host = os.environ['GMP_HOST']
     if 'GMP_PORT' in os.environ:
         port = os.environ['GMP_PORT']
+    if 'GMP_WARM_VARIANTS' in os.environ:
+        # e.g. GMP_WARM_VARIANTS="npuzzle/3,pegsolitaire/triangle"
+        app.config['WARM_VARIANTS'] = parse_variants(os.environ['GMP_WARM_VARIANTS'])
+    warm_variants()
     from waitress import serve
     print(f"Serving at http://{host}:{port}/")
     serve(app, host=host, port=port)
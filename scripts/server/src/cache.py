@@ -0,0 +1,81 @@
+import os
+import threading
+from collections import OrderedDict
+
+def database_version(solver):
+    """Identifies the database file a solver reads from, so that a response
+    cache can notice when it is re-solved or replaced on disk. Solvers
+    without a database file (closed-form solvers) never change."""
+    try:
+        stat = os.stat(solver.path)
+    except (OSError, TypeError, AttributeError):
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+class ResponseCache:
+    """
+    Bounded, thread-safe LRU cache of full position responses, keyed on
+    (puzzle_id, variant_id, position).
+
+    Every variant is tagged with the version of its database file (see
+    database_version). When check_version sees a different version, every
+    cached response of that variant is dropped.
+    """
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def check_version(self, puzzle_id, variant_id, version):
+        """Records the current database version of a variant. Returns True
+        (and invalidates the variant) if it differs from the last one seen."""
+        with self._lock:
+            variant = (puzzle_id, variant_id)
+            if variant not in self._versions:
+                self._versions[variant] = version
+                return False
+            if self._versions[variant] == version:
+                return False
+            self._versions[variant] = version
+            for key in [key for key in self._entries if key[:2] == variant]:
+                del self._entries[key]
+            return True
+
+    def get(self, key):
+        """Returns the cached response of key, or None"""
+        with self._lock:
+            response = self._entries.get(key)
+            if response is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def put(self, key, response):
+        with self._lock:
+            if self.maxsize <= 0:
+                return
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses
+            }
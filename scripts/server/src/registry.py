@@ -0,0 +1,120 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from puzzlesolver.puzzles import PuzzleManager
+
+CLOSED_FORM = "closed_form"
+# Databases of older solvers, which predate any change of a puzzle's hash
+LEGACY_SUFFIXES = ('.bin.gz', '.pickle')
+
+def parse_variants(spec):
+    """Parses a comma-separated list of puzzle_id/variant_id pairs, e.g.
+    "npuzzle/3,pegsolitaire/triangle", into (puzzle_id, variant_id) tuples.
+    Entries without a '/' are ignored."""
+    return [tuple(part.strip() for part in variant.split('/', 1))
+        for variant in spec.split(',') if '/' in variant]
+
+class SolverRegistry:
+    """
+    Keeps track of the solved variants of the server.
+
+    DATABASE_DIR is only listed once (and again when it was modified since):
+    a variant is available if one of the files in it is named after the
+    variant (i.e. what its solver's database would be named) or if its solver
+    is closed-form. Legacy databases do not count for puzzles whose hash
+    changed since (see Puzzle.hash_version). Solvers are only created
+    on the first request for their variant, under a per-variant lock so that
+    concurrent requests share one solver. `warm` opens a list of variants
+    ahead of time on a thread pool.
+    """
+    def __init__(self, database_dir):
+        self.database_dir = database_dir
+        self._files = None
+        self._files_version = None
+        self._solvers = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Lists DATABASE_DIR again, e.g. after new variants were solved"""
+        with self._lock:
+            self._files = None
+
+    def _database_files(self, recheck=False):
+        with self._lock:
+            if recheck and self._files is not None:
+                try:
+                    if os.stat(self.database_dir).st_mtime_ns != self._files_version:
+                        self._files = None
+                except OSError:
+                    pass
+            if self._files is None:
+                try:
+                    self._files_version = os.stat(self.database_dir).st_mtime_ns
+                    self._files = frozenset(name for name in os.listdir(self.database_dir)
+                        if not name.endswith('.tmp'))
+                except OSError:
+                    self._files_version, self._files = None, frozenset()
+            return self._files
+
+    def is_available(self, puzzle_id, variant_id):
+        """Whether the variant is solved. puzzle_id and variant_id must exist."""
+        if (puzzle_id, variant_id) in self._solvers:
+            return True
+        s_cls = PuzzleManager.getSolverClass(puzzle_id, variant_id)
+        if getattr(s_cls, 'path', None) == CLOSED_FORM:
+            return True
+        prefix = '{}{}.'.format(puzzle_id, variant_id)
+        legacy = LEGACY_SUFFIXES if PuzzleManager.getPuzzleClass(puzzle_id).hash_version else ()
+        def solved(files):
+            return any(name.startswith(prefix) and not name.endswith(legacy) for name in files)
+        if solved(self._database_files()):
+            return True
+        # The variant may have been solved since DATABASE_DIR was listed
+        return solved(self._database_files(recheck=True))
+
+    def get_solver(self, puzzle_id, variant_id):
+        """Returns the solver of an available variant, creating it on first use"""
+        key = (puzzle_id, variant_id)
+        solver = self._solvers.get(key)
+        if solver is not None:
+            return solver
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._solvers:
+                self._solvers[key] = self._open(puzzle_id, variant_id)
+            return self._solvers[key]
+
+    def reload(self, puzzle_id, variant_id):
+        """Replaces the solver of a variant, e.g. once its database was re-solved"""
+        key = (puzzle_id, variant_id)
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            self._solvers[key] = self._open(puzzle_id, variant_id)
+            return self._solvers[key]
+
+    def warm(self, variants, max_workers=None):
+        """Opens the solvers of every available (puzzle_id, variant_id) of
+        variants in the background, and loads their databases by looking up
+        the start position. Returns a list of futures."""
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = [executor.submit(self._warm, puzzle_id, variant_id)
+            for puzzle_id, variant_id in variants
+            if PuzzleManager.hasPuzzleId(puzzle_id)
+            and variant_id in PuzzleManager.getPuzzleClass(puzzle_id).variants
+            and self.is_available(puzzle_id, variant_id)]
+        executor.shutdown(wait=False)
+        return futures
+
+    def _warm(self, puzzle_id, variant_id):
+        solver = self.get_solver(puzzle_id, variant_id)
+        solver.getRemoteness(solver.puzzle)
+        return solver
+
+    def _open(self, puzzle_id, variant_id):
+        p_cls = PuzzleManager.getPuzzleClass(puzzle_id)
+        s_cls = PuzzleManager.getSolverClass(puzzle_id, variant_id)
+        puzzle = p_cls.generateStartPosition(variant_id)
+        return s_cls(puzzle, dir_path=self.database_dir)
@@ -3,37 +3,40 @@ from flask import abort, request
 from flask_cors import CORS
 from puzzlesolver.puzzles import PuzzleManager
 from puzzlesolver.util import PuzzleException, PuzzleValue, StringMode
-from werkzeug.exceptions import InternalServerError
-from . import puzzle_solved_variants
+from werkzeug.exceptions import HTTPException, InternalServerError
+from .cache import ResponseCache, database_version
+from .registry import SolverRegistry
 
 app = flask.Flask("PuzzleServer")
 app.config['DATABASE_DIR'] = 'databases'
+app.config['RESPONSE_CACHE_SIZE'] = 4096
+# Largest number of positions answered by one POST /positions/ request
+app.config['MAX_BATCH_POSITIONS'] = 1000
+# (puzzle_id, variant_id) pairs whose solvers are loaded in the background on startup
+app.config['WARM_VARIANTS'] = []
 app.json_provider_class.compact = False
 
 CORS(app)
 
-# Helper functions
-
-def check_available(puzzle_id, variant=None):
-    if puzzle_id not in puzzle_solved_variants:
-        puzzle_solved_variants[puzzle_id] = {}
-        if variant is None: return "unknown"
-    elif len(puzzle_solved_variants[puzzle_id]) == 0:
-        return "unavailable"
-    elif variant is None or variant in puzzle_solved_variants[puzzle_id]:
-        return "available"
-
-    p_cls = PuzzleManager.getPuzzleClass(puzzle_id)
-    s_cls = PuzzleManager.getSolverClass(p_cls.id, variant)
+response_cache = None
+solver_registry = SolverRegistry(app.config['DATABASE_DIR'])
 
-    puzzle = p_cls.generateStartPosition(variant)
-    solver = s_cls(puzzle, dir_path=app.config['DATABASE_DIR'])
+# Helper functions
 
-    import os
-    if os.path.exists(solver.path) or solver.path == "closed_form":
-        puzzle_solved_variants[puzzle_id][variant] = solver
-        return "available"
-    return "not available"
+def get_registry():
+    """Returns the SolverRegistry of the current DATABASE_DIR"""
+    global solver_registry
+    if solver_registry.database_dir != app.config['DATABASE_DIR']:
+        solver_registry = SolverRegistry(app.config['DATABASE_DIR'])
+    return solver_registry
+
+def get_response_cache():
+    """Returns the position response cache, created on first use so that it
+    is sized by the current RESPONSE_CACHE_SIZE"""
+    global response_cache
+    if response_cache is None or response_cache.maxsize != app.config['RESPONSE_CACHE_SIZE']:
+        response_cache = ResponseCache(app.config['RESPONSE_CACHE_SIZE'])
+    return response_cache
 
 def validate(puzzleid=None, variantid=None, position=None):
     if puzzleid == None:
@@ -44,7 +47,7 @@ def validate(puzzleid=None, variantid=None, position=None):
         variants = PuzzleManager.getPuzzleClass(puzzleid).variants
         if variantid not in variants: 
             abort(404, description="VariantId not found")
-        if check_available(puzzleid, variantid) != "available":
+        if not get_registry().is_available(puzzleid, variantid):
             abort(404, description="Puzzle is unavailable")
     if position != None:
         try:
@@ -59,10 +62,7 @@ def get_start_position(puzzle_id, variant_id):
     puzzle = None
     puzzlecls = PuzzleManager.getPuzzleClass(puzzle_id)
     if puzzlecls.startRandomized:
-        solved_variants = puzzle_solved_variants[puzzle_id]
-        if variant_id not in solved_variants:
-            return puzzlecls.generateStartPosition(variant_id)
-        s = solved_variants[variant_id]
+        s = get_registry().get_solver(puzzle_id, variant_id)
         hash_val = s.getRandomSolvableHash()
         puzzle = puzzlecls.fromHash(variant_id, hash_val)
     else:
@@ -78,23 +78,125 @@ def puzzle_position(puzzle_id, variant_id):
     position = request.args.get('p', None)
     if not position:
         abort(404, description="Position not found")
-    validate(puzzle_id, variant_id, position)
-    puzzle = PuzzleManager.getPuzzleClass(puzzle_id).fromString(variant_id, position)
-    s = puzzle_solved_variants[puzzle_id][variant_id]
-
-    # We put this special case for towers of hanoi temporarily because we currently
-    # don't have support for SOLVABLE positions with remoteness > 126.
-    get_value = (lambda _: PuzzleValue.SOLVABLE) if puzzle_id == 'towersofhanoi' else s.getValue
+    validate(puzzle_id, variant_id)
+    return cached_position_response(puzzle_id, variant_id, position)
+
+@app.route('/positions/', methods=['POST'])
+def puzzle_positions():
+    """Batched version of puzzle_position. Takes a JSON body of the form
+    {"positions": [{"puzzleId": ..., "variantId": ..., "position": ...}, ...]}
+    and answers with {"positions": [...]}, one puzzle_position response (or
+    {"error": ...}) per requested position, in request order.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or not isinstance(body.get('positions'), list):
+        abort(404, description="Positions not found")
+    if len(body['positions']) > app.config['MAX_BATCH_POSITIONS']:
+        abort(413, description="At most {} positions per request".format(app.config['MAX_BATCH_POSITIONS']))
+
+    # Group the requests by variant so every variant is validated and its
+    # solver read only once, and look up each distinct position only once.
+    queries = [tuple(
+        query.get(key) if isinstance(query, dict) and isinstance(query.get(key), str) else None
+        for key in ('puzzleId', 'variantId', 'position')
+    ) for query in body['positions']]
+    groups = {}
+    for puzzle_id, variant_id, position in queries:
+        groups.setdefault((puzzle_id, variant_id), set()).add(position)
+
+    responses = {}
+    for (puzzle_id, variant_id), positions in groups.items():
+        try:
+            if puzzle_id is None or variant_id is None:
+                abort(404, description="PuzzleId or VariantId not found")
+            validate(puzzle_id, variant_id)
+        except HTTPException as e:
+            for position in positions:
+                responses[puzzle_id, variant_id, position] = {'error': str(e)}
+            continue
+        group = cached_position_responses(puzzle_id, variant_id, positions)
+        for position, response in group.items():
+            if isinstance(response, HTTPException):
+                response = {'error': str(response)}
+            responses[puzzle_id, variant_id, position] = response
+
+    return {'positions': [responses[query] for query in queries]}
+
+@app.route('/admin/cache/', methods=['GET', 'DELETE'])
+def response_cache_stats():
+    """Hit/miss counters of the position response cache. DELETE empties it."""
+    cache = get_response_cache()
+    if request.method == 'DELETE':
+        cache.clear()
+    return cache.stats()
+
+def cached_position_response(puzzle_id, variant_id, position):
+    """position_response, served from the response cache when possible. The
+    variant must already be validated."""
+    response = cached_position_responses(puzzle_id, variant_id, [position])[position]
+    if isinstance(response, HTTPException):
+        raise response
+    return response
 
-    value = get_value(puzzle)
+def cached_position_responses(puzzle_id, variant_id, positions):
+    """cached_position_response of several positions of one variant. The
+    positions missing from the response cache, and all of their children, are
+    looked up with a single solver read. Returns a dict of position ->
+    response, where the response of an invalid position is the
+    HTTPException it raised. Positions are only validated on a cache miss,
+    since every cached position was valid."""
+    registry, cache = get_registry(), get_response_cache()
+    solver = registry.get_solver(puzzle_id, variant_id)
+    if cache.check_version(puzzle_id, variant_id, database_version(solver)):
+        # The database was re-solved since the solver opened it
+        solver = registry.reload(puzzle_id, variant_id)
+
+    responses, misses = {}, []
+    for position in positions:
+        response = cache.get((puzzle_id, variant_id, position))
+        if response is not None:
+            responses[position] = response
+            continue
+        try:
+            if not position:
+                abort(404, description="Position not found")
+            validate(puzzle_id, variant_id, position)
+        except HTTPException as e:
+            responses[position] = e
+            continue
+        misses.append((position,) + expand_position(puzzle_id, variant_id, position))
+
+    if misses:
+        results = solver.getValuesAndRemotenesses(
+            [p for _, puzzle, _, children in misses for p in [puzzle] + children])
+        start = 0
+        for position, puzzle, moves, children in misses:
+            end = start + 1 + len(children)
+            response = position_response(position, puzzle, moves, children, results[start:end])
+            cache.put((puzzle_id, variant_id, position), response)
+            responses[position] = response
+            start = end
+    return responses
+
+def expand_position(puzzle_id, variant_id, position):
+    """Returns the puzzle of an already validated position, its legal moves
+    and the child reached by each move"""
+    puzzle = PuzzleManager.getPuzzleClass(puzzle_id).fromString(variant_id, position)
+    moves = list(puzzle.generateMoves(movetype='legal'))
+    children = [puzzle.doMove(move) for move in moves]
+    return puzzle, moves, children
+
+def position_response(position, puzzle, moves, children, results):
+    """Builds the puzzle_position response of a position from the values
+    and remotenesses of the position and of its children (see
+    expand_position), in that order"""
+    value, remoteness = results[0]
     response = {'position': position, 'autoguiPosition': puzzle.toString(mode=StringMode.AUTOGUI), 'positionValue': value}
     if value == PuzzleValue.SOLVABLE:
-        response['remoteness'] = s.getRemoteness(puzzle)
+        response['remoteness'] = remoteness
 
     move_objs = []
-    for move in puzzle.generateMoves(movetype='legal'):
-        child_position = puzzle.doMove(move)
-        child_position_value = get_value(child_position)
+    for move, child_position, (child_position_value, child_remoteness) in zip(moves, children, results[1:]):
         move_obj = {
             "position": child_position.toString(mode=StringMode.HUMAN_READABLE),
             "autoguiPosition": child_position.toString(mode=StringMode.AUTOGUI),
@@ -103,7 +205,7 @@ def puzzle_position(puzzle_id, variant_id):
             "autoguiMove": puzzle.moveString(move, mode=StringMode.AUTOGUI)
         }
         if child_position_value == PuzzleValue.SOLVABLE:
-            move_obj['remoteness'] = s.getRemoteness(child_position)
+            move_obj['remoteness'] = child_remoteness
         move_objs.append(move_obj)
         
     response["moves"] = move_objs
@@ -116,4 +218,8 @@ def handle_500(e):
 
 @app.errorhandler(404)
 def handle_404(e):
-    return {'error': str(e)}
\ No newline at end of file
+    return {'error': str(e)}
+
+@app.errorhandler(413)
+def handle_413(e):
+    return {'error': str(e)}, 413
\ No newline at end of file
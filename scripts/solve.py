@@ -1,7 +1,12 @@
 from puzzlesolver.puzzles import PuzzleManager
+from puzzlesolver.solvers import GeneralSolver, ParallelSolver
+import os
 
 # Initalizes the data
 def init_data():
+    processes = data.get("PROCESSES", 1)
+    checkpoint_interval = data.get("CHECKPOINT_INTERVAL", 600)
+    single_pass = data.get("SINGLE_PASS_CSP", False)
     for p_cls in PuzzleManager.getPuzzleClasses():        
         if data["TESTING"]:
             variants = p_cls.test_variants
@@ -10,8 +15,29 @@ def init_data():
         for variant in variants:
             s_cls = PuzzleManager.getSolverClass(p_cls.id, variant)
             puzzle = p_cls.generateStartPosition(variant)
-            solver = s_cls(puzzle, dir_path=data['DATABASE_DIR'])
-            solver.solve(verbose=True)
+            if processes != 1 and issubclass(s_cls, GeneralSolver):
+                # Mix the ParallelSolver in front of the persistence solver
+                s_cls = type(s_cls.__name__, (ParallelSolver, s_cls), {})
+                solver = s_cls(puzzle, dir_path=data['DATABASE_DIR'], processes=processes)
+            else:
+                solver = s_cls(puzzle, dir_path=data['DATABASE_DIR'])
+            starts = getattr(p_cls, 'generateStartPositions', None)
+            if starts is not None and issubclass(s_cls, GeneralSolver):
+                # Puzzles with many fixed starting positions (Rush Hour) are
+                # solved from all of them, so that any of them can be served
+                solver.solveAll(starts(variant), verbose=True)
+            elif issubclass(s_cls, GeneralSolver):
+                # CSPs (puzzles without generateSolutions) may be solved with a
+                # single traversal from the starting position
+                kwargs = {'single_pass': single_pass}
+                if checkpoint_interval is not None:
+                    # Interrupted solves pick up from their last checkpoint
+                    kwargs.update(checkpoint_path=os.path.join(data['DATABASE_DIR'], 'checkpoints',
+                        '{}{}.checkpoint'.format(p_cls.id, variant)),
+                        checkpoint_interval=checkpoint_interval, resume=True)
+                solver.solve(verbose=True, **kwargs)
+            else:
+                solver.solve(verbose=True)
 
 
 if __name__ == "__main__":
@@ -10,6 +10,7 @@ setup(
         'sqlitedict>=1.6.0',
         'progressbar2>=3.51.0',
         'networkx>=2.4',
+        'numpy>=1.17',
     ],
     python_requires='>=3.6'
 )
\ No newline at end of file
@@ -8,7 +8,8 @@ import sys
 sys.path.append("..")
 
 from puzzlesolver.util import PuzzleValue
-from puzzlesolver.puzzles import GraphPuzzle, PuzzleManager
+from puzzlesolver.puzzles import PuzzleManager
+from puzzlesolver.puzzles.graphpuzzle import GraphPuzzle
 
 ########################################################################
 # Server Fixtures
@@ -23,7 +24,7 @@ def database_dir(tmpdir):
         return db_dir
     for p_cls in PuzzleManager.getPuzzleClasses():
         variants = p_cls.test_variants
-        if not variants: warnings.warn(UserWarning("{} does not have any test variants. It's correctness may vary.".format(p_cls.name)))
+        if not variants: warnings.warn(UserWarning("{} does not have any test variants. It's correctness may vary.".format(p_cls.id)))
         for variant in variants:
             s_cls = PuzzleManager.getSolverClass(p_cls.id, variant)
             puzzle = p_cls.generateStartPosition(variant)
@@ -4,7 +4,7 @@ import json
 from puzzlesolver.puzzles import LightsOut as p_cls
 from puzzlesolver.puzzles import PuzzleManager
 from puzzlesolver.solvers import GeneralSolver
-from puzzlesolver.util import PuzzleValue, PuzzleException
+from puzzlesolver.util import PuzzleValue, PuzzleException, StringMode
 
 
 def testSerialization():
@@ -66,6 +66,20 @@ def testMoves():
             puzzle.doMove(move)
 
 
+def testBitboard():
+    """Tests that moves toggle the right lights, and that the hash is the board."""
+    puzzle = p_cls.fromString("3", "000000000")
+    assert puzzle.doMove((0, 0)).toString(StringMode.HUMAN_READABLE) == "110100000"
+    assert puzzle.doMove((1, 1)).toString(StringMode.HUMAN_READABLE) == "010111010"
+    assert puzzle.doMove((2, 1)).toString(StringMode.HUMAN_READABLE) == "001011001"
+    assert puzzle.doMove((1, 1)).doMove((1, 1)).primitive() == PuzzleValue.SOLVABLE
+
+    puzzle = p_cls.fromString("3", "100110001")
+    assert hash(puzzle) == 0b100110001
+    assert p_cls.fromHash("3", hash(puzzle)).toString(StringMode.HUMAN_READABLE) == "100110001"
+    assert puzzle.grid == [[True, False, False], [True, True, False], [False, False, True]]
+
+
 def testPositions():
     """Tests the default start state and finish positions matches the expected serializations."""
 
@@ -1,4 +1,5 @@
 import pytest
+import random
 
 from puzzlesolver.puzzles import Npuzzle, PuzzleManager
 from puzzlesolver.solvers import GeneralSolver, sqlitesolver
@@ -13,6 +14,20 @@ def testRemotenessSanity():
         assert solver.getValue(puzzle) == PuzzleValue.SOLVABLE
         assert solver.getRemoteness(puzzle) == 1
 
+def testHash():
+    random.seed(0)
+    for size in (2, 3, 4):
+        puzzle = Npuzzle(size=size)
+        hash(puzzle)
+        for _ in range(50):
+            puzzle = puzzle.doMove(random.choice(puzzle.generateMoves('legal')))
+            # The hash is updated from the hash of the previous position
+            fresh = Npuzzle(size=size)
+            fresh.position = puzzle.position[:]
+            assert hash(puzzle) == hash(fresh)
+            assert Npuzzle.fromHash(str(size), hash(puzzle)).position == puzzle.position
+        assert 0 <= hash(puzzle) < puzzle.numPositions
+
 def testSerialization():
     for i in range(2,3):
         puzzle = Npuzzle(size=i)
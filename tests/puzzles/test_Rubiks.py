@@ -0,0 +1,50 @@
+import pytest
+import random
+
+from puzzlesolver.puzzles import Rubiks
+from puzzlesolver.puzzles.rubiks import syms
+from puzzlesolver.util import PuzzleValue, StringMode
+
+SOLVED = '000011112222333344445555'
+
+def testHash():
+    random.seed(0)
+    puzzle = Rubiks.generateStartPosition('2x2x2')
+    # The 24 rotations of a cube share its hash
+    rotations = [Rubiks(cube=[puzzle.cube[i] for i in sym]) for sym in syms]
+    assert {hash(rotation) for rotation in rotations} == {hash(puzzle)}
+    assert 0 <= hash(puzzle) < puzzle.numPositions
+    assert hash(puzzle) != hash(puzzle.doMove(0))
+
+    unhashed = Rubiks.fromHash('2x2x2', hash(puzzle))
+    assert hash(unhashed) == hash(puzzle)
+    assert unhashed.toString(StringMode.HUMAN_READABLE) in \
+        {rotation.toString(StringMode.HUMAN_READABLE) for rotation in rotations}
+
+def testMoves():
+    puzzle = Rubiks.fromString('2x2x2', SOLVED)
+    assert puzzle.primitive() == PuzzleValue.SOLVABLE
+    assert puzzle.doMove(0).toString(StringMode.HUMAN_READABLE) == '000051511212232344445353'
+    for move in range(6):
+        # A move is undone by its counterclockwise move, and by 3 more turns
+        assert puzzle.doMove(move).doMove(move + 6).toString(StringMode.HUMAN_READABLE) == SOLVED
+        assert puzzle.doMove(move).doMove(move).doMove(move).doMove(move).primitive() == PuzzleValue.SOLVABLE
+        assert puzzle.doMove(move).primitive() == PuzzleValue.UNDECIDED
+
+def testPrimitive():
+    puzzle = Rubiks.fromString('2x2x2', SOLVED)
+    # Every rotation of the solved cube is solved
+    for solution in puzzle.generateSolutions():
+        assert solution.primitive() == PuzzleValue.SOLVABLE
+        for move in solution.generateMoves('legal'):
+            assert solution.doMove(move).primitive() == PuzzleValue.UNDECIDED
+
+def testSerialization():
+    random.seed(1)
+    for _ in range(10):
+        position = Rubiks.generateStartPosition('2x2x2').toString(StringMode.HUMAN_READABLE)
+        assert Rubiks.fromString('2x2x2', position).toString(StringMode.HUMAN_READABLE) == position
+    # A twisted corner and a corner with two stickers of the same color
+    for position in ['400011112222333304445555', '000000000000000000000000']:
+        with pytest.raises(ValueError):
+            Rubiks.fromString('2x2x2', position)
@@ -83,3 +83,20 @@ def testPuzzleServer(client):
     helper(pid, 'ooooo-xxxxx', '10', 0)
     helper(pid, 'xxxxx-ooooo', '10', 35)
     helper(pid, 'xxxxxooooo-', '10', -1)
+
+def testPositionHashes():
+    for code in ['xxxxx-ooooo', 'ooooo-xxxxx', '-ooxxxoxxoo', 'xxxxxooooo-', 'oxoxo-xoxox']:
+        puzzle = ToadsAndFrogsPuzzle.fromString('10', code)
+        assert puzzle.toString(StringMode.HUMAN_READABLE) == code
+        assert ToadsAndFrogsPuzzle.fromHash('10', hash(puzzle)).toString(StringMode.HUMAN_READABLE) == code
+    assert hash(ToadsAndFrogsPuzzle.fromString('10', 'xxxxx-ooooo')) == hash(ToadsAndFrogsPuzzle('10'))
+    assert hash(ToadsAndFrogsPuzzle.fromString('10', 'ooooo-xxxxx')) == hash(ToadsAndFrogsPuzzle('10').generateSolutions()[0])
+    for code in ['xxxxx-oooo', 'xxxxx--oooo', 'xxxxxyooooo']:
+        with pytest.raises(ValueError): ToadsAndFrogsPuzzle.fromString('10', code)
+
+def testLargeVariants():
+    for variant, remoteness in [('12', 48), ('16', 80), ('20', 120)]:
+        puzzle = ToadsAndFrogsPuzzle.generateStartPosition(variant)
+        solver = GeneralSolver(puzzle)
+        solver.solve()
+        assert solver.getRemoteness(puzzle) == remoteness
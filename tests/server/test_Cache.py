@@ -0,0 +1,60 @@
+import os
+
+from scripts.server.src.cache import ResponseCache, database_version
+
+class FileSolver:
+    def __init__(self, path):
+        self.path = path
+
+def test_lru_eviction():
+    cache = ResponseCache(2)
+    cache.put(('p', 'v', 'a'), {'a': 1})
+    cache.put(('p', 'v', 'b'), {'b': 1})
+    # Reading a makes b the least recently used entry
+    assert cache.get(('p', 'v', 'a')) == {'a': 1}
+    cache.put(('p', 'v', 'c'), {'c': 1})
+    assert cache.get(('p', 'v', 'b')) is None
+    assert cache.get(('p', 'v', 'c')) == {'c': 1}
+    assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 2, 'misses': 1}
+
+    cache.clear()
+    assert cache.stats() == {'size': 0, 'maxsize': 2, 'hits': 0, 'misses': 0}
+
+    cache = ResponseCache(0)
+    cache.put(('p', 'v', 'a'), {'a': 1})
+    assert cache.get(('p', 'v', 'a')) is None
+
+def test_database_invalidation(tmpdir):
+    path = str(tmpdir.join('puzzle.bin'))
+    with open(path, 'wb') as fo:
+        fo.write(b'old')
+    solver = FileSolver(path)
+    cache = ResponseCache()
+    assert not cache.check_version('p', 'v', database_version(solver))
+    cache.put(('p', 'v', 'a'), {'a': 1})
+    cache.put(('p', 'w', 'a'), {'a': 2})
+    assert not cache.check_version('p', 'v', database_version(solver))
+    assert cache.get(('p', 'v', 'a')) == {'a': 1}
+
+    # The database is re-solved into a new file
+    with open(path + '.tmp', 'wb') as fo:
+        fo.write(b'new database')
+    os.replace(path + '.tmp', path)
+    assert cache.check_version('p', 'v', database_version(solver))
+    assert cache.get(('p', 'v', 'a')) is None
+    # Other variants are kept
+    assert cache.get(('p', 'w', 'a')) == {'a': 2}
+
+    # Solvers without a database file never invalidate
+    assert database_version(FileSolver(None)) is None
+    assert database_version(object()) is None
+
+def test_admin_route(client):
+    client.delete('/admin/cache/')
+    url = '/lightsout/3/positions/?p=000000000'
+    first = client.get(url).get_json()
+    assert client.get(url).get_json() == first
+    stats = client.get('/admin/cache/').get_json()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 1, 1)
+    stats = client.delete('/admin/cache/').get_json()
+    assert (stats['hits'], stats['misses'], stats['size']) == (0, 0, 0)
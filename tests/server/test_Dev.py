@@ -10,4 +10,44 @@ def test_default_path(client):
     rv = client.get('/')
     d = json.loads(rv.data)
     for puzzle in d['response']:
-        assert PuzzleManager.hasPuzzleId(puzzle["gameId"])
\ No newline at end of file
+        assert PuzzleManager.hasPuzzleId(puzzle["gameId"])
+def test_positions_batch(client):
+    start = client.get('/towersofhanoi/3_3/start/').get_json()['position']
+    single = client.get('/towersofhanoi/3_3/positions/?p={}'.format(start)).get_json()
+    child = single['moves'][0]['position']
+
+    queries = [
+        {'puzzleId': 'towersofhanoi', 'variantId': '3_3', 'position': start},
+        {'puzzleId': 'towersofhanoi', 'variantId': '3_3', 'position': 'bad'},
+        {'puzzleId': 'towersofhanoi', 'variantId': '3_3', 'position': child},
+        {'puzzleId': 'towersofhanoi', 'variantId': '3_3', 'position': start},
+        {'puzzleId': 'lightsout', 'variantId': '3', 'position': '000000000'},
+        {'puzzleId': 'nopuzzle', 'variantId': '3_3', 'position': start},
+        {'puzzleId': 'towersofhanoi', 'variantId': '3_3'},
+        'not a query'
+    ]
+    d = client.post('/positions/', json={'positions': queries}).get_json()
+    responses = d['positions']
+    assert len(responses) == len(queries)
+    # Valid positions are answered exactly like the single position route
+    assert responses[0] == responses[3] == single
+    assert responses[2] == client.get('/towersofhanoi/3_3/positions/?p={}'.format(child)).get_json()
+    assert responses[4] == client.get('/lightsout/3/positions/?p=000000000').get_json()
+    assert responses[4]['remoteness'] == 0
+    # Invalid queries only fail their own entry
+    for i in (1, 5, 6, 7):
+        assert set(responses[i]) == {'error'}
+
+def test_positions_batch_limit(client):
+    limit = app.config['MAX_BATCH_POSITIONS']
+    app.config['MAX_BATCH_POSITIONS'] = 2
+    try:
+        query = {'puzzleId': 'lightsout', 'variantId': '3', 'position': '000000000'}
+        rv = client.post('/positions/', json={'positions': [query] * 2})
+        assert len(rv.get_json()['positions']) == 2
+        rv = client.post('/positions/', json={'positions': [query] * 3})
+        assert rv.status_code == 413 and 'error' in rv.get_json()
+    finally:
+        app.config['MAX_BATCH_POSITIONS'] = limit
+    rv = client.post('/positions/', json={'queries': []})
+    assert 'error' in rv.get_json()
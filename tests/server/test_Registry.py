@@ -0,0 +1,61 @@
+import threading
+import time
+
+from puzzlesolver.puzzles import Hanoi, Rubiks
+from puzzlesolver.solvers import IndexSolver
+from scripts.server.src.registry import SolverRegistry, parse_variants
+
+def test_lazy_loading(tmpdir):
+    IndexSolver(Hanoi.generateStartPosition('3_3'), dir_path=str(tmpdir)).solve()
+    registry = SolverRegistry(str(tmpdir))
+    opened = []
+    open_solver = registry._open
+    def slow_open(puzzle_id, variant_id):
+        opened.append((puzzle_id, variant_id))
+        time.sleep(0.05)
+        return open_solver(puzzle_id, variant_id)
+    registry._open = slow_open
+
+    # Nothing is opened before the first request
+    assert registry.is_available(Hanoi.id, '3_3') and not opened
+
+    solvers = []
+    threads = [threading.Thread(target=lambda: solvers.append(registry.get_solver(Hanoi.id, '3_3')))
+        for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert opened == [(Hanoi.id, '3_3')]
+    assert len(solvers) == 8 and all(solver is solvers[0] for solver in solvers)
+    assert solvers[0].getRemoteness(Hanoi.generateStartPosition('3_3')) == 7
+
+def test_availability(tmpdir):
+    registry = SolverRegistry(str(tmpdir))
+    assert not registry.is_available(Hanoi.id, '3_3')
+    # Closed-form variants need no database
+    assert registry.is_available('lightsout', '3')
+
+    # Solved after the directory was listed
+    IndexSolver(Hanoi.generateStartPosition('3_3'), dir_path=str(tmpdir)).solve()
+    assert registry.is_available(Hanoi.id, '3_3')
+    assert not registry.is_available(Hanoi.id, '3_4')
+
+    # Legacy databases only count for puzzles whose hash never changed
+    tmpdir.join(Hanoi.id + '3_4.bin.gz').write('')
+    tmpdir.join(Rubiks.id + '2x2x2.bin.gz').write('')
+    registry.refresh()
+    assert registry.is_available(Hanoi.id, '3_4')
+    assert not registry.is_available(Rubiks.id, '2x2x2')
+
+def test_warm(tmpdir):
+    IndexSolver(Hanoi.generateStartPosition('3_3'), dir_path=str(tmpdir)).solve()
+    registry = SolverRegistry(str(tmpdir))
+    futures = registry.warm([(Hanoi.id, '3_3'), (Hanoi.id, '3_4'), ('nopuzzle', '3'), (Hanoi.id, '9_9')])
+    assert len(futures) == 1
+    assert futures[0].result() is registry.get_solver(Hanoi.id, '3_3')
+
+def test_parse_variants():
+    assert parse_variants("npuzzle/3, pegsolitaire/triangle") == [('npuzzle', '3'), ('pegsolitaire', 'triangle')]
+    assert parse_variants("towersofhanoi/3_3,broken,,") == [('towersofhanoi', '3_3')]
+    assert parse_variants("") == []
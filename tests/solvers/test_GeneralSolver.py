@@ -1,6 +1,6 @@
 import pytest
 
-from puzzlesolver.puzzles import GraphPuzzle
+from puzzlesolver.puzzles.graphpuzzle import GraphPuzzle
 from puzzlesolver.solvers import GeneralSolver
 from puzzlesolver.util import PuzzleValue
 
@@ -36,4 +36,159 @@ def testSolutionsError():
         solver = GeneralSolver(record_sol)
         solver.solve()
     except AssertionError:
-        pass
\ No newline at end of file
+        pass
+
+def testHashFrontier():
+    from puzzlesolver.puzzles import Hanoi
+
+    puzzle = Hanoi.generateStartPosition('3_3')
+    solver = GeneralSolver(puzzle)
+    solver.solve()
+
+    # Hanoi has a reversible hash, so the solve never leaves anything queued
+    assert solver._queue.empty()
+    assert solver.getRemoteness(puzzle) == 7
+    for h in solver._remoteness:
+        assert hash(Hanoi.fromHash('3_3', h)) == h
+
+def testValuesAndRemotenesses():
+    from puzzlesolver.puzzles import Peg
+
+    puzzle = Peg.generateStartPosition('triangle')
+    solver = GeneralSolver(puzzle)
+    solver.solve()
+
+    puzzles = [puzzle] + [puzzle.doMove(move) for move in puzzle.generateMoves('legal')]
+    puzzles += [puzzles[-1].doMove(move) for move in puzzles[-1].generateMoves('legal')]
+    expected = [(solver.getValue(p), solver.getRemoteness(p)) for p in puzzles]
+    assert solver.getValuesAndRemotenesses(puzzles) == expected
+    assert solver.getRemotenesses(iter(puzzles)) == [r for _, r in expected]
+
+def testCheckpoint(tmpdir):
+    from puzzlesolver.puzzles import Hanoi
+
+    puzzle = Hanoi.generateStartPosition('3_4')
+    path = str(tmpdir.join('checkpoints', 'hanoi.checkpoint'))
+
+    class InterruptedSolver(GeneralSolver):
+        def _expandLevel(self, frontier, remoteness):
+            if remoteness == 6:
+                raise KeyboardInterrupt
+            return GeneralSolver._expandLevel(self, frontier, remoteness)
+
+    with pytest.raises(KeyboardInterrupt):
+        InterruptedSolver(puzzle).solve(checkpoint_path=path)
+
+    solver = GeneralSolver(puzzle)
+    solver.solve(checkpoint_path=path, resume=True)
+    expected = GeneralSolver(puzzle)
+    expected.solve()
+    assert solver._remoteness == expected._remoteness
+    assert not tmpdir.join('checkpoints', 'hanoi.checkpoint').exists()
+
+    with pytest.raises(KeyboardInterrupt):
+        InterruptedSolver(puzzle).solve(checkpoint_path=path)
+    with pytest.raises(ValueError):
+        GeneralSolver(Hanoi.generateStartPosition('3_3')).solve(checkpoint_path=path, resume=True)
+
+def testSinglePass():
+    from puzzlesolver.puzzles import NQueens
+
+    class CSPQueens(NQueens):
+        def generateSolutions(self):
+            return []
+
+    def start():
+        puzzle = NQueens.generateStartPosition('5')
+        puzzle.__class__ = CSPQueens
+        return puzzle
+
+    twoPass = GeneralSolver(start())
+    twoPass.solve()
+    onePass = GeneralSolver(start())
+    onePass.solve(single_pass=True)
+
+    # Only the positions reachable from the starting position are classified
+    reachable, stack = {hash(start())}, [start()]
+    while stack:
+        puzzle = stack.pop()
+        for move in puzzle.generateMoves('legal'):
+            child = puzzle.doMove(move)
+            if hash(child) not in reachable:
+                reachable.add(hash(child))
+                stack.append(child)
+    assert onePass._remoteness == {h: r for h, r in twoPass._remoteness.items() if h in reachable}
+    assert onePass.getRemoteness(start()) == 5
+
+def testLazyTable():
+    from puzzlesolver.puzzles import Hanoi
+    from puzzlesolver.solvers.tables import DenseTable
+
+    # Nothing is allocated for solvers that are never solved, e.g. the
+    # ones of the server
+    solver = GeneralSolver(Hanoi.generateStartPosition('3_3'))
+    assert solver._remoteness == {} and type(solver._remoteness) is dict
+    solver.solve()
+    assert isinstance(solver._remoteness, DenseTable)
+    assert solver.getRemoteness(solver.puzzle) == 7
+
+def testCSPBitmap(monkeypatch):
+    from puzzlesolver.puzzles import NQueens
+    from puzzlesolver.solvers import generalsolver
+    from puzzlesolver.solvers.tables import HashSet
+
+    class CSPQueens(NQueens):
+        def generateSolutions(self):
+            return []
+
+    found = []
+    class RecordedHashSet(HashSet):
+        def __init__(self, size=None):
+            HashSet.__init__(self, size)
+            found.append(self)
+    monkeypatch.setattr(generalsolver, 'HashSet', RecordedHashSet)
+
+    puzzle = NQueens.generateStartPosition('5')
+    puzzle.__class__ = CSPQueens
+    for single_pass in (False, True):
+        GeneralSolver(puzzle).solve(single_pass=single_pass)
+    # NQueens hashes are bounded, so the found positions are all in the bitmap
+    assert len(found) == 2
+    for positions in found:
+        assert positions.size == puzzle.numPositions
+        assert len(positions) > 0 and not positions._overflow
+
+def testUncheckedMoves(monkeypatch):
+    from puzzlesolver.puzzles import TopSpin
+
+    puzzle = TopSpin.generateStartPosition('6_2')
+    expected = GeneralSolver(puzzle)
+    expected.solve()
+
+    # The solver applies the moves it generates without checking them again
+    def doMove(self, move, **kwargs):
+        raise AssertionError("doMove checks the move against generateMoves")
+    monkeypatch.setattr(TopSpin, 'doMove', doMove)
+    solver = GeneralSolver(puzzle)
+    solver.solve()
+    assert solver._remoteness == expected._remoteness
+
+def testSolveAll():
+    # Two disconnected puzzle trees, solved from a position of each
+    def component(start, solution):
+        puzzle = GraphPuzzle(start, csp=True)
+        puzzle.setMove(GraphPuzzle(solution, value=PuzzleValue.SOLVABLE, csp=True), movetype="bi")
+        return puzzle
+    first, second = component(0, 1), component(2, 3)
+
+    solver = GeneralSolver(first)
+    solver.solve()
+    assert solver.getRemoteness(first) == 1
+    assert solver.getRemoteness(second) == PuzzleValue.MAX_REMOTENESS
+
+    solver = GeneralSolver(first)
+    solver.solveAll([first, second, first])
+    assert solver.getRemoteness(first) == 1
+    assert solver.getRemoteness(second) == 1
+    assert len(solver._remoteness) == 4
+    assert solver.puzzle is first
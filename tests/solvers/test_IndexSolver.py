@@ -0,0 +1,112 @@
+import gzip
+
+import pytest
+
+from puzzlesolver.puzzles import Hanoi, Rubiks
+from puzzlesolver.solvers import GeneralSolver, IndexSolver
+from puzzlesolver.solvers.database import IndexDatabase, pack_nibbles, unpack_nibbles
+from puzzlesolver.util import PuzzleValue
+
+def test_database(tmpdir):
+    puzzle = Hanoi.generateStartPosition('3_3')
+    general = GeneralSolver(puzzle)
+    general.solve()
+
+    solver = IndexSolver(puzzle, dir_path=tmpdir)
+    solver.solve()
+
+    db = IndexDatabase(solver.path)
+    assert (db.puzzle_id, db.variant) == (Hanoi.id, '3_3')
+    assert db.max_hash == max(general._remoteness)
+    for h in range(len(db) + 1):
+        assert db[h] == general._remoteness.get(h, PuzzleValue.MAX_REMOTENESS)
+    db.close()
+
+    # A fresh solver only maps the file that was written
+    solver = IndexSolver(puzzle, dir_path=tmpdir)
+    assert solver.getRemoteness(puzzle) == 7
+    assert solver.getRandomSolvableHash() in general._remoteness
+
+def test_width(tmpdir):
+    # Hanoi 3_8 has remotenesses up to 255, which need two bytes per entry
+    puzzle = Hanoi.generateStartPosition('3_8')
+    solver = IndexSolver(puzzle, dir_path=tmpdir)
+    solver.solve()
+    assert solver.getRemoteness(puzzle) == 255
+    assert solver.getValue(puzzle) == PuzzleValue.SOLVABLE
+    assert solver.db.width == 16
+
+    path = str(tmpdir.join('widths.bin'))
+    for width, remoteness in [(4, 14), (8, 15), (8, 254), (16, 255), (16, 65534), (32, 65535)]:
+        IndexDatabase.write(path, 'test', 'test', {0: 0, 1: remoteness, 3: 1})
+        db = IndexDatabase(path)
+        assert db.width == width
+        assert [db[h] for h in range(5)] == [0, remoteness, PuzzleValue.MAX_REMOTENESS, 1, PuzzleValue.MAX_REMOTENESS]
+        assert list(db.solvable()) == [0, 1, 3]
+        db.close()
+
+def test_empty_and_negative(tmpdir):
+    path = str(tmpdir.join('empty.bin'))
+    IndexDatabase.write(path, 'test', 'test', {})
+    db = IndexDatabase(path)
+    assert db.max_hash == -1 and len(db) == 0
+    assert db[0] == PuzzleValue.MAX_REMOTENESS
+    assert list(db.solvable()) == []
+    with pytest.raises(IndexError): db.random_solvable()
+    db.close()
+
+    with pytest.raises(ValueError): IndexDatabase.write(path, 'test', 'test', {-1: 0, 2: 1})
+
+def test_nibbles():
+    values = bytes(i % 16 for i in range(1001))
+    packed = pack_nibbles(values)
+    assert len(packed) == 501
+    assert packed[0] == 0x10 and packed[-1] == values[-1]
+    assert unpack_nibbles(packed, len(values)).tobytes() == values
+
+def test_random_solvable(tmpdir):
+    path = str(tmpdir.join('sparse.bin'))
+    # Too sparse for rejection sampling to find anything
+    for width, remoteness in [(4, 3), (8, 200), (16, 300)]:
+        table = {7: 0, 4096: 1, 99999: remoteness}
+        IndexDatabase.write(path, 'test', 'test', table)
+        db = IndexDatabase(path)
+        assert db.solvable_count == 3
+        assert {db.random_solvable() for _ in range(100)} == set(table)
+        db.solvable_count = None
+        assert db.count_solvable() == 3
+        assert db.entries(4095, 4098).tolist() == [db._unsolvable, 1, db._unsolvable]
+        db.close()
+
+    puzzle = Hanoi.generateStartPosition('3_3')
+    solver = IndexSolver(puzzle, dir_path=tmpdir)
+    solver.solve()
+    for _ in range(100):
+        assert solver.getValue(Hanoi.fromHash('3_3', solver.getRandomSolvableHash())) == PuzzleValue.SOLVABLE
+
+def test_hash_version(tmpdir):
+    # A gzipped database of an older IndexSolver is still read for puzzles
+    # whose hash never changed
+    puzzle = Hanoi.generateStartPosition('3_3')
+    general = GeneralSolver(puzzle)
+    general.solve()
+    entries = bytes(general._remoteness.get(h, IndexDatabase.LEGACY_UNSOLVABLE) for h in range(puzzle.numPositions))
+    with gzip.open(str(tmpdir.join(Hanoi.id + '3_3.bin.gz')), 'wb') as fo:
+        fo.write(entries)
+    solver = IndexSolver(puzzle, dir_path=tmpdir)
+    assert solver.path.endswith('.bin.gz')
+    assert solver.getRemoteness(puzzle) == 7
+
+    # but not for Rubiks, whose hash changed since
+    cube = Rubiks.generateStartPosition('2x2x2')
+    with gzip.open(str(tmpdir.join(Rubiks.id + '2x2x2.bin.gz')), 'wb') as fo:
+        fo.write(bytes(range(100)))
+    solver = IndexSolver(cube, dir_path=tmpdir)
+    assert solver.path.endswith('.bin')
+    with pytest.raises(FileNotFoundError): solver.getRemoteness(cube)
+
+    # Neither are databases written with an older hash
+    IndexDatabase.write(solver.path, Rubiks.id, '2x2x2', {hash(cube): 3})
+    with pytest.raises(ValueError): IndexSolver(cube, dir_path=tmpdir).getRemoteness(cube)
+    IndexDatabase.write(solver.path, Rubiks.id, '2x2x2', {hash(cube): 3}, Rubiks.hash_version)
+    assert IndexSolver(cube, dir_path=tmpdir).getRemoteness(cube) == 3
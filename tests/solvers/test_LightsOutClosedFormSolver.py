@@ -0,0 +1,52 @@
+import random
+import pytest
+
+from puzzlesolver.puzzles import LightsOut
+from puzzlesolver.solvers import GeneralSolver, LightsOutClosedFormSolver
+from puzzlesolver.solvers import lightsoutclosedformsolver
+from puzzlesolver.solvers.lightsoutclosedformsolver import BitmaskGF2Matrix
+
+def matrices():
+    yield BitmaskGF2Matrix
+    try:
+        from puzzlesolver.extern import m4ri_utils
+    except ImportError:
+        return
+    yield m4ri_utils.GF2Matrix
+
+@pytest.fixture(params=list(matrices()))
+def matrix(request, monkeypatch):
+    monkeypatch.setattr(lightsoutclosedformsolver, 'GF2Matrix', request.param)
+    return request.param
+
+def test_remotenesses(matrix):
+    puzzle = LightsOut.generateStartPosition('3')
+    general = GeneralSolver(puzzle)
+    general.solve()
+    solver = LightsOutClosedFormSolver(puzzle)
+
+    puzzles = [LightsOut.fromHash('3', h) for h in range(2 ** 9)]
+    expected = [general.getRemoteness(p) for p in puzzles]
+    assert solver.getRemotenesses(puzzles) == expected
+    assert [solver.getRemoteness(p) for p in puzzles] == expected
+    assert solver.getRemotenesses([]) == []
+
+def test_mixed_variants(matrix):
+    solver = LightsOutClosedFormSolver(LightsOut.generateStartPosition('3'))
+    puzzles = [LightsOut.generateStartPosition(v) for v in ['3', '2', '8', '3']]
+    assert solver.getRemotenesses(puzzles) == [solver.getRemoteness(p) for p in puzzles]
+
+def test_bitmask_matrix():
+    A = [[1, 1, 0], [0, 1, 1], [0, 0, 1]]
+    inverse = BitmaskGF2Matrix(A).inverse()
+    assert inverse.tolist() == [[1, 1, 1], [0, 1, 1], [0, 0, 1]]
+    with pytest.raises(ValueError):
+        BitmaskGF2Matrix([[1, 1], [1, 1]]).inverse()
+
+    # Small batches are computed without NumPy, large ones with it
+    random.seed(0)
+    boards = [random.getrandbits(3) for _ in range(100)]
+    expected = [sum(sum(a & (board >> (2 - j)) for j, a in enumerate(row)) % 2 for row in inverse.tolist())
+        for board in boards]
+    assert [inverse.popcounts([board])[0] for board in boards] == expected
+    assert inverse.popcounts(boards) == expected
@@ -0,0 +1,29 @@
+import pytest
+
+from puzzlesolver.puzzles import Hanoi, Peg, NQueens
+from puzzlesolver.solvers import GeneralSolver, ParallelSolver
+
+class CSPQueens(NQueens):
+    """NQueens without generateSolutions, i.e. solved as a CSP. Defined at
+    module level so that it can be sent to the worker processes."""
+    def generateSolutions(self):
+        return []
+
+########################################################################
+# Tests
+########################################################################
+
+def testSimple(simple):
+    simple(ParallelSolver, csp=False)
+    simple(ParallelSolver, csp=True)
+
+def testMatchesGeneralSolver():
+    csp = CSPQueens('5')
+    puzzles = [Hanoi.generateStartPosition('3_3'), Peg.generateStartPosition('star'),
+        NQueens.generateStartPosition('5'), csp]
+    for puzzle in puzzles:
+        serial = GeneralSolver(puzzle)
+        serial.solve()
+        parallel = ParallelSolver(puzzle, processes=2, chunksize=16)
+        parallel.solve()
+        assert parallel._remoteness == serial._remoteness
@@ -0,0 +1,81 @@
+import pickle
+
+import pytest
+
+from puzzlesolver.puzzles import Hanoi
+from puzzlesolver.solvers import GeneralSolver, PickleSolver
+from puzzlesolver.solvers.database import SortedDatabase
+from puzzlesolver.util import PuzzleValue
+
+def test_database(tmpdir):
+    puzzle = Hanoi.generateStartPosition('3_3')
+    general = GeneralSolver(puzzle)
+    general.solve()
+
+    solver = PickleSolver(puzzle, dir_path=tmpdir)
+    solver.solve()
+    assert solver.path.endswith('.sorted')
+    # Random picks come from the file that was written, not from a copy of the table
+    assert solver.db is not None
+    assert solver.getRandomSolvableHash() in general._remoteness
+
+    db = SortedDatabase(solver.path)
+    assert (db.puzzle_id, db.variant) == (Hanoi.id, '3_3')
+    assert len(db) == len(general._remoteness)
+    assert (db.hash_bits, db.width) == (32, 4)
+    for h in range(max(general._remoteness) + 2):
+        assert db[h] == general._remoteness.get(h, PuzzleValue.MAX_REMOTENESS)
+    db.close()
+
+    # A fresh solver only maps the file that was written
+    solver = PickleSolver(puzzle, dir_path=tmpdir)
+    assert solver.getRemoteness(puzzle) == 7
+    assert solver.getRemotenesses([puzzle, puzzle]) == [7, 7]
+    assert solver.db is not None and not solver._remoteness
+    assert solver.getRandomSolvableHash() in general._remoteness
+
+def test_widths(tmpdir):
+    path = str(tmpdir.join('widths.sorted'))
+    for width, remoteness in [(4, 15), (8, 255), (16, 65535), (32, 65536)]:
+        SortedDatabase.write(path, 'test', 'test', {7: 0, 3: remoteness, 12: 1})
+        db = SortedDatabase(path)
+        assert (db.hash_bits, db.width) == (32, width)
+        assert [db[h] for h in [2, 3, 7, 12, 13]] == [PuzzleValue.MAX_REMOTENESS, remoteness, 0, 1, PuzzleValue.MAX_REMOTENESS]
+        assert [a.tolist() for a in db.arrays()] == [[3, 7, 12], [remoteness, 0, 1]]
+        db.close()
+
+    # Hashes outside of [0, 2 ** 32) are stored in 8 bytes
+    remoteness = {-5: 2, 0: 1, 1 << 40: 3}
+    SortedDatabase.write(path, 'test', 'test', remoteness)
+    db = SortedDatabase(path)
+    assert db.hash_bits == 64
+    assert {h: db[h] for h in remoteness} == remoteness
+    assert db[1] == PuzzleValue.MAX_REMOTENESS
+    assert db.random_solvable() in remoteness
+    db.close()
+
+    SortedDatabase.write(path, 'test', 'test', {})
+    db = SortedDatabase(path)
+    assert len(db) == 0 and db[0] == PuzzleValue.MAX_REMOTENESS
+    with pytest.raises(IndexError): db.random_solvable()
+    db.close()
+
+def test_legacy_pickle(tmpdir):
+    puzzle = Hanoi.generateStartPosition('3_3')
+    general = GeneralSolver(puzzle)
+    general.solve()
+    with open(str(tmpdir.join(Hanoi.id + '3_3.pickle')), 'wb') as fo:
+        pickle.dump(dict(general._remoteness.items()), fo)
+
+    solver = PickleSolver(puzzle, dir_path=tmpdir)
+    assert solver.path.endswith('.pickle')
+    assert solver.getRemoteness(puzzle) == 7
+    assert solver.getRandomSolvableHash() in general._remoteness
+
+    # Solving further moves the database to the new format
+    solver.solveAll([puzzle])
+    assert solver.path.endswith('.sorted')
+    solver = PickleSolver(puzzle, dir_path=tmpdir)
+    assert solver.path.endswith('.sorted')
+    assert solver.getRemoteness(puzzle) == 7
+    assert len(solver.db) == len(general._remoteness)
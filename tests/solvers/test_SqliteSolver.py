@@ -1,7 +1,7 @@
 import pytest
 
 from puzzlesolver.solvers import SqliteSolver
-from puzzlesolver.puzzles import GraphPuzzle
+from puzzlesolver.puzzles.graphpuzzle import GraphPuzzle
 from puzzlesolver.util import PuzzleValue
 
 def test_simple(tmpdir):
@@ -0,0 +1,42 @@
+import pickle
+from array import array
+
+from puzzlesolver.solvers.tables import DenseTable, HashSet, remotenessTable, MAX_DENSE_SIZE
+
+def test_remoteness_table():
+    assert isinstance(remotenessTable(100), DenseTable)
+    assert remotenessTable(None) == {} and type(remotenessTable(None)) is dict
+    assert type(remotenessTable(MAX_DENSE_SIZE + 1)) is dict
+
+def test_dense_table():
+    table, expected = DenseTable(10), {}
+    assert not table
+    # In range, out of range, and entries that need to be widened
+    for h, remoteness in [(3, 1), (0, 0), (12, 5), (-1, 2), (4, 300), (3, 7), (9, 70000)]:
+        table[h] = remoteness
+        expected[h] = remoteness
+        assert table == expected
+    assert len(table) == len(expected) and set(table) == set(expected)
+    assert table.get(5) is None and 5 not in table and 4 in table
+    del table[3], expected[3]
+    assert table == expected
+    assert pickle.loads(pickle.dumps(table)) == expected
+
+    hashes, values = table.arrays()
+    assert dict(zip(hashes.tolist(), values.tolist())) == expected
+
+def test_hash_set():
+    found = HashSet(10)
+    for h in [0, 3, 3, 9, 10, -4]:
+        found.add(h)
+    assert len(found) == 5
+    assert all(h in found for h in [0, 3, 9, 10, -4])
+    assert not any(h in found for h in [1, 8, 11])
+
+def test_setdefaults():
+    table = DenseTable(10)
+    table[3] = 0
+    added = table.setdefaults(array('q', [5, 3, 12, 5, -1, 2, 12]), 300)
+    assert list(added) == [2, 5, 12, -1]
+    assert table == {3: 0, 2: 300, 5: 300, 12: 300, -1: 300}
+    assert list(table.setdefaults(array('q', [2, 12]), 1)) == []